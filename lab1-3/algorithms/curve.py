@@ -1,90 +1,236 @@
-import math
-
 class CurveAlgorithms:
-    def __init__(self, logger):
-        self.log = logger
+    def __init__(self, tracer):
+        self.trace = tracer
     
     def circle(self, xc, yc, r):
         """Алгоритм Брезенхема для окружности"""
-        def plot_circle_points(x, y):
-            points = [
-                (xc + x, yc + y), (xc - x, yc + y),
-                (xc + x, yc - y), (xc - x, yc - y),
-                (xc + y, yc + x), (xc - y, yc + x),
-                (xc + y, yc - x), (xc - y, yc - x)
-            ]
-            for i, p in enumerate(points):
-                self.log(f"Окружность: точка {i + 1} {p}")
-            return points
+        return list(self.circle_iter(xc, yc, r))
+    
+    def circle_iter(self, xc, yc, r):
+        """Потоковый алгоритм Брезенхема для окружности"""
+        self.trace.begin("circle", xc, yc, r)
+        trace = self.trace.step if self.trace.steps else None
         
         x = 0
         y = r
         d = 3 - 2 * r
         
-        all_points = []
-        all_points.extend(plot_circle_points(x, y))
-        
-        while y >= x:
+        index = 0
+        while True:
+            for p in ((xc + x, yc + y), (xc - x, yc + y),
+                      (xc + x, yc - y), (xc - x, yc - y),
+                      (xc + y, yc + x), (xc - y, yc + x),
+                      (xc + y, yc - x), (xc - y, yc - x)):
+                if trace:
+                    trace("circle", index, p[0], p[1])
+                index += 1
+                yield p
+            
+            if y < x:
+                break
+            
             x += 1
             if d > 0:
                 y -= 1
                 d = d + 4 * (x - y) + 10
             else:
                 d = d + 4 * x + 6
-            all_points.extend(plot_circle_points(x, y))
-        
-        return all_points
     
     def ellipse(self, xc, yc, a, b):
-        """Алгоритм для эллипса"""
-        points = []
-        for angle in range(0, 720, 1):
-            rad = math.radians(angle)
-            x = xc + a * math.cos(rad)
-            y = yc + b * math.sin(rad)
-            points.append((round(x), round(y)))
-            self.log(f"Эллипс: точка {angle + 1} ({round(x)}, {round(y)})")
-        
-        return points
+        """Алгоритм средней точки для эллипса"""
+        return list(self.ellipse_iter(xc, yc, a, b))
     
-    def hyperbola(self, xc, yc, a, b, steps=500):
-        """Алгоритм построения гиперболы x²/a² - y²/b² = 1"""
-        points = []
-        
-        # Правая ветвь
-        x_start = a
-        x_end = xc + 5 * a  # Ограничиваем для визуализации
-        
-        for i in range(steps + 1):
-            x = x_start + (x_end - x_start) * i / steps
-            y = b * math.sqrt((x/a)**2 - 1)
-            points.append((round(x + xc), round(y + yc)))
-            points.append((round(x + xc), round(-y + yc)))
-            self.log(f"Гипербола: точка {i + 1} ({round(x + xc)}, {round(y + yc)})")
-        
-        # Левая ветвь (зеркальное отражение)
-        for i in range(steps + 1):
-            x = -x_start - (x_end - x_start) * i / steps
-            y = b * math.sqrt((x/a)**2 - 1)
-            points.append((round(x + xc), round(y + yc)))
-            points.append((round(x + xc), round(-y + yc)))
-            self.log(f"Гипербола: точка {i + 1} ({round(x + xc)}, {round(y + yc)})")
-        
-        return points
+    def ellipse_iter(self, xc, yc, a, b):
+        """Потоковый целочисленный алгоритм средней точки для эллипса.
+        
+        Строится четверть (x >= 0, y >= 0), остальное - симметрией. Решающие
+        переменные умножены на 4, поэтому вычисления только целые. Точки на
+        осях не дублируются.
+        """
+        self.trace.begin("ellipse", xc, yc, a, b)
+        trace = self.trace.step if self.trace.steps else None
+        
+        a2 = a * a
+        b2 = b * b
+        index = 0
+        
+        def plot_ellipse_points(x, y):
+            if x == 0 and y == 0:
+                return ((xc, yc),)
+            if x == 0:
+                return ((xc, yc + y), (xc, yc - y))
+            if y == 0:
+                return ((xc + x, yc), (xc - x, yc))
+            return ((xc + x, yc + y), (xc - x, yc + y), (xc + x, yc - y), (xc - x, yc - y))
+        
+        x = 0
+        y = b
+        dx = 0
+        dy = 2 * a2 * y
+        
+        # Область 1: наклон меньше 1 по модулю, шаг по x
+        d1 = 4 * b2 - 4 * a2 * b + a2
+        while dx < dy:
+            for p in plot_ellipse_points(x, y):
+                if trace:
+                    trace("ellipse", index, p[0], p[1])
+                index += 1
+                yield p
+            
+            x += 1
+            dx += 2 * b2
+            if d1 < 0:
+                d1 += 4 * (dx + b2)
+            else:
+                y -= 1
+                dy -= 2 * a2
+                d1 += 4 * (dx - dy + b2)
+        
+        # Область 2: шаг по y
+        d2 = b2 * (2 * x + 1) ** 2 + 4 * a2 * (y - 1) ** 2 - 4 * a2 * b2
+        while y >= 0:
+            for p in plot_ellipse_points(x, y):
+                if trace:
+                    trace("ellipse", index, p[0], p[1])
+                index += 1
+                yield p
+            
+            y -= 1
+            dy -= 2 * a2
+            if d2 > 0:
+                d2 += 4 * (a2 - dy)
+            else:
+                x += 1
+                dx += 2 * b2
+                d2 += 4 * (dx - dy + a2)
+        
+        # У очень сплюснутых эллипсов область 2 заканчивается раньше x = a
+        while x < a:
+            x += 1
+            for p in plot_ellipse_points(x, 0):
+                if trace:
+                    trace("ellipse", index, p[0], p[1])
+                index += 1
+                yield p
+    
+    def hyperbola(self, xc, yc, a, b, width=800, height=600):
+        """Алгоритм средней точки для гиперболы x²/a² - y²/b² = 1"""
+        return list(self.hyperbola_iter(xc, yc, a, b, width, height))
     
-    def parabola(self, xc, yc, p, steps=500):
-        """Алгоритм построения параболы y² = 2px"""
-        points = []
-        
-        # Верхняя и нижняя ветви
-        x_start = 0
-        x_end = xc + 5 * p  # Ограничиваем для визуализации
-        
-        for i in range(steps + 1):
-            x = x_start + (x_end - x_start) * i / steps
-            y = math.sqrt(2 * p * x)
-            points.append((round(x + xc), round(y + yc)))
-            points.append((round(x + xc), round(-y + yc)))
-            self.log(f"Парабола: точка {i + 1} ({round(x + xc)}, {round(y + yc)})")
-        
-        return points
\ No newline at end of file
+    def hyperbola_iter(self, xc, yc, a, b, width=800, height=600):
+        """Потоковый целочисленный алгоритм средней точки для гиперболы.
+        
+        Строится четверть от вершины (a, 0), обе ветви получаются симметрией.
+        Построение идёт, пока отражённые точки могут попасть в область
+        width x height, и выдаёт только видимые точки.
+        """
+        self.trace.begin("hyperbola", xc, yc, a, b)
+        trace = self.trace.step if self.trace.steps else None
+        
+        if a <= 0 or b <= 0:
+            return
+        
+        a2 = a * a
+        b2 = b * b
+        index = 0
+        
+        def visible_points(x, y):
+            xs = (xc + x, xc - x)
+            ys = (yc + y, yc - y) if y else (yc,)
+            return [(px, py) for py in ys if 0 <= py < height
+                    for px in xs if 0 <= px < width]
+        
+        def alive(x, y):
+            return (xc + x < width or xc - x >= 0) and (yc + y < height or yc - y >= 0)
+        
+        x = a
+        y = 0
+        
+        # Область 1: наклон больше 1, шаг по y
+        d1 = b2 * (2 * x + 1) ** 2 - 4 * a2 * (y + 1) ** 2 - 4 * a2 * b2
+        while b2 * (2 * x + 1) > 2 * a2 * (y + 1) and alive(x, y):
+            for p in visible_points(x, y):
+                if trace:
+                    trace("hyperbola", index, p[0], p[1])
+                index += 1
+                yield p
+            
+            y += 1
+            if d1 < 0:
+                x += 1
+                d1 += 8 * b2 * x
+            d1 -= 4 * a2 * (2 * y + 1)
+        
+        # Область 2 (только при b < a): наклон меньше 1, шаг по x
+        d2 = 4 * b2 * (x + 1) ** 2 - a2 * (2 * y + 1) ** 2 - 4 * a2 * b2
+        while alive(x, y):
+            for p in visible_points(x, y):
+                if trace:
+                    trace("hyperbola", index, p[0], p[1])
+                index += 1
+                yield p
+            
+            x += 1
+            if d2 > 0:
+                y += 1
+                d2 -= 8 * a2 * y
+            d2 += 4 * b2 * (2 * x + 1)
+    
+    def parabola(self, xc, yc, p, width=800, height=600):
+        """Алгоритм средней точки для параболы y² = 2px"""
+        return list(self.parabola_iter(xc, yc, p, width, height))
+    
+    def parabola_iter(self, xc, yc, p, width=800, height=600):
+        """Потоковый целочисленный алгоритм средней точки для параболы.
+        
+        Строится верхняя ветвь от вершины, нижняя - симметрией. Построение
+        идёт, пока точки могут попасть в область width x height, и выдаёт
+        только видимые точки.
+        """
+        self.trace.begin("parabola", xc, yc, p)
+        trace = self.trace.step if self.trace.steps else None
+        
+        index = 0
+        
+        def visible_points(x, y):
+            px = xc + x
+            if not 0 <= px < width:
+                return []
+            ys = (yc + y, yc - y) if y else (yc,)
+            return [(px, py) for py in ys if 0 <= py < height]
+        
+        def alive(x, y):
+            return xc + x < width and (yc + y < height or yc - y >= 0)
+        
+        x = 0
+        y = 0
+        
+        # Область 1: наклон больше 1 (y < p), шаг по y
+        d1 = (y + 1) ** 2 - 2 * p * x - p
+        while y < p and alive(x, y):
+            for point in visible_points(x, y):
+                if trace:
+                    trace("parabola", index, point[0], point[1])
+                index += 1
+                yield point
+            
+            y += 1
+            if d1 > 0:
+                x += 1
+                d1 -= 2 * p
+            d1 += 2 * y + 1
+        
+        # Область 2: наклон меньше 1, шаг по x
+        d2 = (2 * y + 1) ** 2 - 8 * p * (x + 1)
+        while alive(x, y):
+            for point in visible_points(x, y):
+                if trace:
+                    trace("parabola", index, point[0], point[1])
+                index += 1
+                yield point
+            
+            x += 1
+            if d2 < 0:
+                y += 1
+                d2 += 8 * y
+            d2 -= 8 * p
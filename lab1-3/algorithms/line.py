@@ -1,30 +1,180 @@
+import math
+
+import numpy as np
+
+# Запас окна отсечения в пикселях: пиксели алгоритмов отходят от идеального
+# отрезка меньше чем на два пикселя, поэтому за расширенным окном видимых нет
+CLIP_MARGIN = 2
+
+
+def _segment_index(counts):
+    """Смещения отрезков в пакете, номер отрезка и номер шага для каждого пикселя"""
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    seg = np.repeat(np.arange(len(counts)), counts)
+    k = np.arange(offsets[-1], dtype=np.int64) - offsets[seg]
+    return offsets, seg, k
+
+
+def _accumulate(start, inc, counts):
+    """Последовательное накопление start, start + inc, ... как в скалярном цикле.
+    
+    Отрезки группируются по длине, внутри группы сумма считается вдоль строки,
+    поэтому ошибки округления совпадают с поточечным `x += x_inc`.
+    """
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    out = np.empty(offsets[-1], dtype=np.float64)
+    for n in np.unique(counts):
+        if n == 0:
+            continue
+        idx = np.nonzero(counts == n)[0]
+        block = np.empty((len(idx), n), dtype=np.float64)
+        block[:, 0] = start[idx]
+        block[:, 1:] = inc[idx, None]
+        np.cumsum(block, axis=1, out=block)
+        out[(offsets[idx, None] + np.arange(n)).ravel()] = block.ravel()
+    return out
+
+
+def _clip_range(x1, y1, x2, y2, width, height):
+    """Отсечение Лианга-Барски: диапазон [t0, t1] параметра точек отрезка
+    внутри окна width x height, расширенного на CLIP_MARGIN.
+    
+    Работает и с массивами отрезков; у невидимого отрезка t0 > t1.
+    """
+    x1, y1, x2, y2 = (np.asarray(v, dtype=np.float64) for v in (x1, y1, x2, y2))
+    dx = x2 - x1
+    dy = y2 - y1
+    t0 = np.zeros(dx.shape)
+    t1 = np.ones(dx.shape)
+    for p, q in ((-dx, x1 + CLIP_MARGIN), (dx, width - 1 + CLIP_MARGIN - x1),
+                 (-dy, y1 + CLIP_MARGIN), (dy, height - 1 + CLIP_MARGIN - y1)):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = q / p
+        t0 = np.where(p < 0, np.maximum(t0, r), t0)
+        t1 = np.where(p > 0, np.minimum(t1, r), t1)
+        # Отрезок, параллельный границе и лежащий за ней, не виден
+        t1 = np.where((p == 0) & (q < 0), -1.0, t1)
+    return t0, t1
+
+
+def _clip_steps(t0, t1, n):
+    """Номера первого и последнего шага из n + 1, попавших в [t0, t1]"""
+    first = np.maximum(np.ceil(t0 * n), 0).astype(np.int64)
+    last = np.minimum(np.floor(t1 * n), n).astype(np.int64)
+    last = np.where(t0 > t1, -1, last)
+    return first, last
+
+
+def _visible(xs, ys, intensity, offsets, width, height):
+    """Оставляет пиксели внутри окна width x height"""
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    return _drop(xs, ys, intensity, offsets, ~inside)
+
+
+def _vertices(points, dtype):
+    """Вершины ломаной как массив (N, 2); одна вершина - вырожденное звено"""
+    vertices = np.asarray(points, dtype=dtype).reshape(-1, 2)
+    if len(vertices) == 1:
+        vertices = np.vstack([vertices, vertices])
+    return vertices
+
+
+def _drop(xs, ys, intensity, offsets, drop):
+    """Убирает отмеченные пиксели и пересчитывает смещения отрезков"""
+    if not drop.any():
+        return xs, ys, intensity, offsets
+    keep = ~drop
+    seg = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    offsets = np.zeros(len(offsets), dtype=np.int64)
+    np.cumsum(np.bincount(seg[keep], minlength=len(offsets) - 1), out=offsets[1:])
+    return xs[keep], ys[keep], intensity[keep], offsets
+
+
 class LineAlgorithms:
-    def __init__(self, logger):
-        self.log = logger
+    def __init__(self, tracer):
+        self.trace = tracer
     
-    def dda(self, x1, y1, x2, y2):
+    def dda(self, x1, y1, x2, y2, width=None, height=None):
         """Цифровой дифференциальный анализатор"""
+        self.trace.begin("dda", x1, y1, x2, y2)
+        xs, ys, _, _ = self.dda_batch([(x1, y1, x2, y2)], width, height)
+        points = list(zip(xs.tolist(), ys.tolist()))
+        if self.trace.steps:
+            step = self.trace.step
+            for i, (x, y) in enumerate(points):
+                step("dda", i, x, y)
+        
+        return points
+    
+    def bresenham(self, x1, y1, x2, y2, width=None, height=None):
+        """Алгоритм Брезенхема для отрезков"""
+        self.trace.begin("bresenham", x1, y1, x2, y2)
+        xs, ys, _, _ = self.bresenham_batch([(x1, y1, x2, y2)], width, height)
+        points = list(zip(xs.tolist(), ys.tolist()))
+        if self.trace.steps:
+            step = self.trace.step
+            for i, (x, y) in enumerate(points):
+                step("bresenham", i, x, y)
+        
+        return points
+    
+    def wu(self, x1, y1, x2, y2, width=None, height=None):
+        """Алгоритм Ву для сглаживания линий (полная версия)"""
+        self.trace.begin("wu", x1, y1, x2, y2)
+        xs, ys, intensity, _ = self.wu_batch([(x1, y1, x2, y2)], width, height)
+        points = list(zip(xs.tolist(), ys.tolist(), intensity.tolist()))
+        if self.trace.steps:
+            step = self.trace.step
+            for i, (x, y, value) in enumerate(points):
+                step("wu", i, x, y, value)
+        
+        return points
+    
+    def dda_iter(self, x1, y1, x2, y2, width=None, height=None):
+        """Потоковый ЦДА: точки выдаются по одной.
+        
+        Если заданы width и height, выдаются только точки окна width x height,
+        а шаги за его пределами не выполняются.
+        """
+        self.trace.begin("dda", x1, y1, x2, y2)
+        trace = self.trace.step if self.trace.steps else None
+        
         dx = x2 - x1
         dy = y2 - y1
-        steps = max(abs(dx), abs(dy))
+        steps = max(abs(dx), abs(dy), 1)
         
         x_inc = dx / steps
         y_inc = dy / steps
         
-        x = x1
-        y = y1
+        first, last = 0, max(abs(dx), abs(dy))
+        if width is not None:
+            first, last = map(int, _clip_steps(*_clip_range(x1, y1, x2, y2, width, height), last))
+        
+        x = x1 + first * x_inc
+        y = y1 + first * y_inc
         
-        points = []
-        for i in range(steps + 1):
-            points.append((round(x), round(y)))
-            self.log(f"ЦДА шаг {i}: ({round(x)}, {round(y)})")
+        index = 0
+        for _ in range(first, last + 1):
+            point = (round(x), round(y))
+            if width is None or (0 <= point[0] < width and 0 <= point[1] < height):
+                if trace:
+                    trace("dda", index, point[0], point[1])
+                index += 1
+                yield point
             x += x_inc
             y += y_inc
-        
-        return points
     
-    def bresenham(self, x1, y1, x2, y2):
-        """Алгоритм Брезенхема для отрезков"""
+    def bresenham_iter(self, x1, y1, x2, y2, width=None, height=None):
+        """Потоковый алгоритм Брезенхема для отрезков.
+        
+        С окном width x height цикл начинается с первого видимого шага:
+        ошибка на шаге k известна в замкнутом виде (см. bresenham_batch).
+        """
+        self.trace.begin("bresenham", x1, y1, x2, y2)
+        trace = self.trace.step if self.trace.steps else None
+        
         dx = abs(x2 - x1)
         dy = abs(y2 - y1)
         steep = dy > dx
@@ -32,7 +182,6 @@ class LineAlgorithms:
         if steep:
             x1, y1 = y1, x1
             x2, y2 = y2, x2
-            dx, dy = dy, dx
         
         if x1 > x2:
             x1, x2 = x2, x1
@@ -40,41 +189,46 @@ class LineAlgorithms:
         
         dx = x2 - x1
         dy = abs(y2 - y1)
-        error = dx // 2
         ystep = 1 if y1 < y2 else -1
-        y = y1
         
-        points = []
-        for x in range(x1, x2 + 1):
-            coord = (y, x) if steep else (x, y)
-            points.append(coord)
-            self.log(f"Брезенхем шаг {x-x1}: {coord}")
+        # Окно в осях (большая, малая)
+        first, last = 0, dx
+        if width is not None:
+            width, height = (height, width) if steep else (width, height)
+            first, last = map(int, _clip_steps(*_clip_range(x1, y1, x2, y2, width, height), dx))
+        
+        m = -((dx // 2 - first * dy) // max(dx, 1))
+        error = dx // 2 - first * dy + m * dx
+        y = y1 + ystep * m
+        
+        index = 0
+        for x in range(x1 + first, x1 + last + 1):
+            if width is None or (0 <= x < width and 0 <= y < height):
+                coord = (y, x) if steep else (x, y)
+                if trace:
+                    trace("bresenham", index, coord[0], coord[1])
+                index += 1
+                yield coord
             error -= dy
             if error < 0:
                 y += ystep
                 error += dx
-        
-        return points
     
-    def wu(self, x1, y1, x2, y2):
-        """Алгоритм Ву для сглаживания линий (полная версия)"""
-        points = []
+    def wu_iter(self, x1, y1, x2, y2, width=None, height=None):
+        """Потоковый алгоритм Ву: пиксели (x, y, интенсивность).
         
-        def plot(x, y, intensity):
-            """Добавляет точку с учетом интенсивности"""
-            points.append((round(x), round(y), intensity))
-            self.log(f"Ву: пиксель ({round(x)}, {round(y)}), интенсивность {intensity:.2f}")
-            return (round(x), round(y))
+        Окно width x height ограничивает только столбцы основного цикла,
+        концы считаются по исходным дробным координатам, поэтому видимые
+        пиксели совпадают с построением без отсечения.
+        """
+        self.trace.begin("wu", x1, y1, x2, y2)
+        trace = self.trace.step if self.trace.steps else None
         
-        # Определяем steep (наклон больше 45 градусов)
         steep = abs(y2 - y1) > abs(x2 - x1)
-        
-        # Если steep=True, меняем местами x и y
         if steep:
             x1, y1 = y1, x1
             x2, y2 = y2, x2
         
-        # Гарантируем, что линия рисуется слева направо
         if x1 > x2:
             x1, x2 = x2, x1
             y1, y2 = y2, y1
@@ -83,44 +237,274 @@ class LineAlgorithms:
         dy = y2 - y1
         gradient = dy / dx if dx != 0 else 1
         
-        # Первая точка
+        def pair(x, y, frac, gap):
+            """Два пикселя по малой оси с дополняющими интенсивностями"""
+            if steep:
+                return ((y, x, (1 - frac) * gap), (y + 1, x, frac * gap))
+            return ((x, y, (1 - frac) * gap), (x, y + 1, frac * gap))
+        
+        # Концевые точки
         xend = round(x1)
         yend = y1 + gradient * (xend - x1)
-        xgap = 1 - (x1 + 0.5) % 1
         xpxl1 = xend
-        ypxl1 = int(yend)
-        
-        if steep:
-            plot(ypxl1, xpxl1, (1 - (yend % 1)) * xgap)
-            plot(ypxl1 + 1, xpxl1, (yend % 1) * xgap)
-        else:
-            plot(xpxl1, ypxl1, (1 - (yend % 1)) * xgap)
-            plot(xpxl1, ypxl1 + 1, (yend % 1) * xgap)
-        
+        first = pair(xpxl1, int(yend), yend % 1, 1 - (x1 + 0.5) % 1)
         intery = yend + gradient
         
-        # Вторая точка
         xend = round(x2)
         yend = y2 + gradient * (xend - x2)
-        xgap = (x2 + 0.5) % 1
         xpxl2 = xend
-        ypxl2 = int(yend)
+        last = pair(xpxl2, int(yend), yend % 1, (x2 + 0.5) % 1)
         
-        if steep:
-            plot(ypxl2, xpxl2, (1 - (yend % 1)) * xgap)
-            plot(ypxl2 + 1, xpxl2, (yend % 1) * xgap)
-        else:
-            plot(xpxl2, ypxl2, (1 - (yend % 1)) * xgap)
-            plot(xpxl2, ypxl2 + 1, (yend % 1) * xgap)
+        # Столбцы основного цикла
+        start, stop = xpxl1 + 1, xpxl2
+        if width is not None:
+            t0, t1 = _clip_range(x1, y1, x2, y2, *((height, width) if steep else (width, height)))
+            if t0 > t1:
+                stop = start
+            else:
+                start = max(start, math.ceil(x1 + t0 * dx))
+                stop = min(stop, math.floor(x1 + t1 * dx) + 1)
+            if start > xpxl1 + 1:
+                intery = y1 + gradient * (xpxl1 - x1) + gradient * (start - xpxl1)
+        
+        def visible(pixels):
+            if width is None:
+                return pixels
+            return [p for p in pixels if 0 <= p[0] < width and 0 <= p[1] < height]
+        
+        index = 0
+        for pixel in visible(first + last):
+            if trace:
+                trace("wu", index, *pixel)
+            index += 1
+            yield pixel
         
         # Основной цикл
-        for x in range(xpxl1 + 1, xpxl2):
-            if steep:
-                plot(int(intery), x, 1 - (intery % 1))
-                plot(int(intery) + 1, x, intery % 1)
-            else:
-                plot(x, int(intery), 1 - (intery % 1))
-                plot(x, int(intery) + 1, intery % 1)
+        for x in range(start, stop):
+            for pixel in visible(pair(x, int(intery), intery % 1, 1)):
+                if trace:
+                    trace("wu", index, *pixel)
+                index += 1
+                yield pixel
             intery += gradient
+    
+    def dda_batch(self, segments, width=None, height=None):
+        """ЦДА для пакета отрезков.
+        
+        segments - массив (N, 4) из x1, y1, x2, y2. Возвращает xs, ys, intensity
+        и offsets: пиксели отрезка i лежат в диапазоне offsets[i]:offsets[i + 1].
+        С окном width x height считаются только шаги видимой части отрезков.
+        """
+        x1, y1, x2, y2 = np.asarray(segments, dtype=np.int64).reshape(-1, 4).T
+        dx = x2 - x1
+        dy = y2 - y1
+        steps = np.maximum(np.abs(dx), np.abs(dy))
+        first, last = np.zeros_like(steps), steps
+        if width is not None:
+            first, last = _clip_steps(*_clip_range(x1, y1, x2, y2, width, height), steps)
+        counts = np.maximum(last - first + 1, 0)
+        
+        # Вырожденный отрезок даёт одну точку
+        div = np.where(steps == 0, 1, steps)
+        x = _accumulate(x1 + first * (dx / div), dx / div, counts)
+        y = _accumulate(y1 + first * (dy / div), dy / div, counts)
+        
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        xs = np.rint(x).astype(np.int64)
+        ys = np.rint(y).astype(np.int64)
+        if width is not None:
+            return _visible(xs, ys, np.ones(len(xs)), offsets, width, height)
+        return xs, ys, np.ones(len(xs)), offsets
+    
+    def bresenham_batch(self, segments, width=None, height=None):
+        """Алгоритм Брезенхема для пакета отрезков.
+        
+        Ошибка после k шагов равна dx // 2 - k * dy + m * dx и лежит в [0, dx),
+        откуда число шагов по малой оси m вычисляется без цикла. Поэтому
+        с окном width x height шаги считаются только в видимом диапазоне k.
+        """
+        x1, y1, x2, y2 = np.asarray(segments, dtype=np.int64).reshape(-1, 4).T
+        steep = np.abs(y2 - y1) > np.abs(x2 - x1)
+        
+        # a - большая ось, b - малая
+        a1 = np.where(steep, y1, x1)
+        b1 = np.where(steep, x1, y1)
+        a2 = np.where(steep, y2, x2)
+        b2 = np.where(steep, x2, y2)
+        
+        swap = a1 > a2
+        a1, a2 = np.where(swap, a2, a1), np.where(swap, a1, a2)
+        b1, b2 = np.where(swap, b2, b1), np.where(swap, b1, b2)
+        
+        dx = a2 - a1
+        dy = np.abs(b2 - b1)
+        ystep = np.where(b1 < b2, 1, -1)
+        
+        first, last = np.zeros_like(dx), dx
+        if width is not None:
+            first, last = _clip_steps(*_clip_range(a1, b1, a2, b2, np.where(steep, height, width),
+                                                   np.where(steep, width, height)), dx)
+        
+        offsets, seg, k = _segment_index(np.maximum(last - first + 1, 0))
+        k += first[seg]
+        m = -((dx[seg] // 2 - k * dy[seg]) // np.maximum(dx[seg], 1))
+        major = a1[seg] + k
+        minor = b1[seg] + ystep[seg] * m
+        
+        s = steep[seg]
+        xs = np.where(s, minor, major)
+        ys = np.where(s, major, minor)
+        if width is not None:
+            return _visible(xs, ys, np.ones(len(xs)), offsets, width, height)
+        return xs, ys, np.ones(len(xs)), offsets
+    
+    def wu_batch(self, segments, width=None, height=None):
+        """Алгоритм Ву для пакета отрезков.
+        
+        Порядок пикселей отрезка как в скалярной версии: две пары концевых
+        точек, затем пары пикселей основного цикла. Окно width x height
+        сокращает только столбцы основного цикла: концы и градиент берутся
+        из исходных дробных координат.
+        """
+        x1, y1, x2, y2 = np.asarray(segments, dtype=np.float64).reshape(-1, 4).T
+        
+        # Определяем steep (наклон больше 45 градусов)
+        steep = np.abs(y2 - y1) > np.abs(x2 - x1)
+        x1, y1 = np.where(steep, y1, x1), np.where(steep, x1, y1)
+        x2, y2 = np.where(steep, y2, x2), np.where(steep, x2, y2)
+        
+        # Гарантируем, что линия рисуется слева направо
+        swap = x1 > x2
+        x1, x2 = np.where(swap, x2, x1), np.where(swap, x1, x2)
+        y1, y2 = np.where(swap, y2, y1), np.where(swap, y1, y2)
+        
+        dx = x2 - x1
+        dy = y2 - y1
+        gradient = np.divide(dy, dx, out=np.ones_like(dx), where=dx != 0)
+        
+        # Первая точка
+        xend1 = np.rint(x1)
+        yend1 = y1 + gradient * (xend1 - x1)
+        xgap1 = 1 - (x1 + 0.5) % 1
+        ypxl1 = np.trunc(yend1)
+        
+        # Вторая точка
+        xend2 = np.rint(x2)
+        yend2 = y2 + gradient * (xend2 - x2)
+        xgap2 = (x2 + 0.5) % 1
+        ypxl2 = np.trunc(yend2)
+        
+        inner = np.maximum(xend2 - xend1 - 1, 0).astype(np.int64)
+        first = np.zeros_like(inner)
+        if width is not None:
+            t0, t1 = _clip_range(x1, y1, x2, y2, np.where(steep, height, width), np.where(steep, width, height))
+            first = np.maximum(np.ceil(x1 + t0 * dx) - xend1 - 1, 0).astype(np.int64)
+            last = np.minimum(np.floor(x1 + t1 * dx) - xend1 - 1, inner - 1).astype(np.int64)
+            inner = np.where(t0 > t1, 0, np.maximum(last - first + 1, 0))
+        counts = 4 + 2 * inner
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        
+        major = np.empty(offsets[-1], dtype=np.float64)
+        minor = np.empty(offsets[-1], dtype=np.float64)
+        intensity = np.empty(offsets[-1], dtype=np.float64)
+        
+        start = offsets[:-1]
+        for i, (xp, yp, yend, xgap) in enumerate(((xend1, ypxl1, yend1, xgap1),
+                                                  (xend2, ypxl2, yend2, xgap2))):
+            major[start + 2 * i] = xp
+            minor[start + 2 * i] = yp
+            intensity[start + 2 * i] = (1 - (yend % 1)) * xgap
+            major[start + 2 * i + 1] = xp
+            minor[start + 2 * i + 1] = yp + 1
+            intensity[start + 2 * i + 1] = (yend % 1) * xgap
+        
+        # Основной цикл
+        intery = _accumulate(yend1 + gradient * (1 + first), gradient, inner)
+        _, seg, k = _segment_index(inner)
+        pos = start[seg] + 4 + 2 * k
+        x = xend1[seg] + 1 + first[seg] + k
+        frac = intery % 1
+        major[pos] = x
+        minor[pos] = np.trunc(intery)
+        intensity[pos] = 1 - frac
+        major[pos + 1] = x
+        minor[pos + 1] = np.trunc(intery) + 1
+        intensity[pos + 1] = frac
+        
+        _, seg, _ = _segment_index(counts)
+        s = steep[seg]
+        xs = np.where(s, minor, major).astype(np.int64)
+        ys = np.where(s, major, minor).astype(np.int64)
+        if width is not None:
+            return _visible(xs, ys, intensity, offsets, width, height)
+        return xs, ys, intensity, offsets
+    
+    def bresenham_polyline(self, points, width=None, height=None):
+        """Ломаная Брезенхема по массиву вершин (N, 2) за один пакет.
+        
+        Звенья идут от вершины к вершине, общий пиксель вершины выдаётся
+        один раз. offsets - диапазоны пикселей звеньев, как у bresenham_batch.
+        """
+        vertices = _vertices(points, np.int64)
+        segments = np.hstack([vertices[:-1], vertices[1:]])
+        xs, ys, intensity, offsets = self.bresenham_batch(segments, width, height)
+        
+        # Звенья, которые Брезенхем строит от конца к началу, разворачиваются
+        x1, y1, x2, y2 = segments.T
+        steep = np.abs(y2 - y1) > np.abs(x2 - x1)
+        reverse = np.where(steep, y1 > y2, x1 > x2)
+        counts = np.diff(offsets)
+        _, seg, k = _segment_index(counts)
+        order = np.where(reverse[seg], offsets[seg + 1] - 1 - k, offsets[seg] + k)
+        xs, ys = xs[order], ys[order]
+        
+        # Первый пиксель звена, совпадающий с его начальной вершиной, уже
+        # выдан предыдущим звеном
+        first = offsets[1:-1][counts[1:] > 0]
+        start = np.nonzero(counts[1:] > 0)[0] + 1
+        shared = first[(xs[first] == x1[start]) & (ys[first] == y1[start])]
+        joint = np.zeros(len(xs), dtype=bool)
+        joint[shared] = True
+        return _drop(xs, ys, intensity, offsets, joint)
+    
+    def wu_polyline(self, points, width=None, height=None):
+        """Сглаженная ломаная Ву по массиву вершин (N, 2) за один пакет.
+        
+        Ячейку, в которую попали пиксели соседних звеньев, рисует их общая
+        вершина: это концевые пары с долей покрытия по дробной части конца,
+        пиксели основного цикла на изломе и пиксели звена нулевой длины у
+        повторённой вершины. Такие пиксели объединяются по ячейке: доли
+        покрытия складываются (с ограничением единицей), и пиксель выдаётся
+        один раз, на месте первого появления. Пересечения несоседних звеньев
+        остаются как есть.
+        """
+        vertices = _vertices(points, np.float64)
+        segments = np.hstack([vertices[:-1], vertices[1:]])
+        xs, ys, intensity, offsets = self.wu_batch(segments, width, height)
+        if not len(xs):
+            return xs, ys, intensity, offsets
+        _, seg, _ = _segment_index(np.diff(offsets))
+        
+        # Пиксели по ячейкам, внутри ячейки - по звеньям; группа продолжается,
+        # пока номера звеньев идут подряд
+        px, py = xs - xs.min(), ys - ys.min()
+        cells = py * (px.max() + 1) + px
+        order = np.lexsort((seg, cells))
+        cells, seg = cells[order], seg[order]
+        start = np.ones(len(order), dtype=bool)
+        start[1:] = (cells[1:] != cells[:-1]) | (seg[1:] - seg[:-1] > 1)
+        group = np.cumsum(start) - 1
+        
+        total = np.zeros(group[-1] + 1)
+        np.add.at(total, group, intensity[order])
+        first = np.full(len(total), len(xs))
+        np.minimum.at(first, group, order)
+        merged = np.bincount(group) > 1
         
-        return points
\ No newline at end of file
+        intensity = intensity.copy()
+        intensity[first[merged]] = np.minimum(total[merged], 1)
+        duplicate = np.ones(len(xs), dtype=bool)
+        duplicate[first] = False
+        return _drop(xs, ys, intensity, offsets, duplicate)
@@ -1,89 +1,372 @@
+import numpy as np
+
+from algorithms.line import LineAlgorithms
+
+# Матрица Эрмита
+HERMITE = [
+    [2, -2, 1, 1],
+    [-3, 3, -2, -1],
+    [0, 0, 1, 0],
+    [1, 0, 0, 0]
+]
+
+# Матрица Безье
+BEZIER = [
+    [-1, 3, -3, 1],
+    [3, -6, 3, 0],
+    [-3, 3, 0, 0],
+    [1, 0, 0, 0]
+]
+
+# Матрица B-сплайна (с множителем 1/6)
+BSPLINE = [
+    [-1, 3, -3, 1],
+    [3, -6, 3, 0],
+    [-3, 0, 3, 0],
+    [1, 4, 1, 0]
+]
+
+# Допустимое отклонение кусков от кривой в адаптивном режиме (пиксели)
+# и предельная глубина деления, защищающая от вырожденных входов
+FLATNESS = 0.5
+MAX_DEPTH = 16
+
+# Сколько точек B-сплайна вычисляется за один пакет сегментов
+BATCH_POINTS = 1 << 16
+
+_powers_cache = {}
+
+
+def powers(steps):
+    """Таблицы t³, t², t для t = i / steps, общие для всех сегментов.
+    
+    Степени считаются так же, как в скалярном T = [t**3, t**2, t, 1],
+    поэтому результат совпадает с ним до бита.
+    """
+    table = _powers_cache.get(steps)
+    if table is None:
+        ts = [i / steps for i in range(steps + 1)]
+        table = (np.array([t**3 for t in ts]), np.array([t**2 for t in ts]), np.array(ts))
+        _powers_cache[steps] = table
+    return table
+
+
+def cubic_coefficients(M, G):
+    """Коэффициенты кубического полинома M·G (один раз на сегмент)"""
+    return [sum(M[i][j] * G[j] for j in range(4)) for i in range(4)]
+
+
+def evaluate_cubic(coefficients, steps, scale=1):
+    """Значения полинома во всех точках t = i / steps.
+    
+    Коэффициенты - числа или массивы по сегментам; для массивов результат
+    содержит строку на сегмент. Слагаемые складываются в том же порядке,
+    что и sum(T[i] * c[i]), так что округление до пикселей не отличается
+    от поточечного вычисления.
+    """
+    t3, t2, t1 = powers(steps)
+    c = [np.asarray(ci)[..., None] for ci in coefficients]
+    values = t3 * c[0] + t2 * c[1] + t1 * c[2] + c[3]
+    return values / scale if scale != 1 else values
+
+
+def uniform_knots(count, degree=3):
+    """Равномерный узловой вектор 0, 1, ..., count + degree"""
+    return list(range(count + degree + 1))
+
+
+def clamped_knots(count, degree=3):
+    """Узловой вектор с кратными концевыми узлами: кривая проходит через
+    первую и последнюю опорные точки"""
+    inner = count - degree
+    return [0] * degree + list(range(inner + 1)) + [inner] * degree
+
+
+def de_boor(control, degree, knots, ts, spans):
+    """Точки B-сплайна в параметрах ts, вычисленные сразу для всех ts.
+    
+    spans[i] - номер интервала узлов knots[k] <= ts[i] <= knots[k + 1],
+    на котором вычисляется точка. Возвращает массив (len(ts), 2).
+    """
+    control = np.asarray(control, dtype=np.float64)
+    knots = np.asarray(knots, dtype=np.float64)
+    p = degree
+    
+    # d[j] - j-я опорная точка интервала для каждого t
+    d = control[spans - p + np.arange(p + 1)[:, None]]
+    for r in range(1, p + 1):
+        for j in range(p, r - 1, -1):
+            left = knots[spans + j - p]
+            right = knots[spans + j + 1 - r]
+            alpha = ((ts - left) / (right - left))[:, None]
+            d[j] = d[j - 1] + alpha * (d[j] - d[j - 1])
+    return d[p]
+
+
+def uniform_bspline(points, start, stop, steps):
+    """Значения однородного кубического B-сплайна на сегментах start..stop-1:
+    массивы x и y по строке из steps + 1 значений на сегмент"""
+    P = np.asarray(points[start:stop + 3])
+    
+    # Векторы геометрии всех сегментов пакета
+    Gx = [P[j:j + stop - start, 0] for j in range(4)]
+    Gy = [P[j:j + stop - start, 1] for j in range(4)]
+    
+    x = evaluate_cubic(cubic_coefficients(BSPLINE, Gx), steps, 6)
+    y = evaluate_cubic(cubic_coefficients(BSPLINE, Gy), steps, 6)
+    return x, y
+
+
+def hermite_to_bezier(p1, p4, r1, r4):
+    """Опорные точки Безье для сегмента Эрмита"""
+    return [
+        p1,
+        (p1[0] + r1[0] / 3, p1[1] + r1[1] / 3),
+        (p4[0] - r4[0] / 3, p4[1] - r4[1] / 3),
+        p4
+    ]
+
+
+def bspline_to_bezier(p0, p1, p2, p3):
+    """Опорные точки Безье для сегмента однородного кубического B-сплайна"""
+    return [
+        ((p0[0] + 4 * p1[0] + p2[0]) / 6, (p0[1] + 4 * p1[1] + p2[1]) / 6),
+        ((2 * p1[0] + p2[0]) / 3, (2 * p1[1] + p2[1]) / 3),
+        ((p1[0] + 2 * p2[0]) / 3, (p1[1] + 2 * p2[1]) / 3),
+        ((p1[0] + 4 * p2[0] + p3[0]) / 6, (p1[1] + 4 * p2[1] + p3[1]) / 6)
+    ]
+
+
+def flatten(bezier, tolerance=FLATNESS):
+    """Деление кривой Безье пополам (де Кастельжо), пока куски не станут
+    плоскими с точностью tolerance.
+    
+    Возвращает куски (начало, конец, t0, t1) в порядке обхода кривой.
+    Плоскость проверяется по оценке Уиллкокса: отклонение от хорды не
+    больше tolerance, если ux + uy <= 16 * tolerance².
+    """
+    limit = 16 * tolerance * tolerance
+    pieces = []
+    stack = [(bezier, 0.0, 1.0, 0)]
+    while stack:
+        (b0, b1, b2, b3), t0, t1, depth = stack.pop()
+        ux = max((3 * b1[0] - 2 * b0[0] - b3[0])**2, (3 * b2[0] - b0[0] - 2 * b3[0])**2)
+        uy = max((3 * b1[1] - 2 * b0[1] - b3[1])**2, (3 * b2[1] - b0[1] - 2 * b3[1])**2)
+        if ux + uy <= limit or depth >= MAX_DEPTH:
+            pieces.append((b0, b3, t0, t1))
+            continue
+        
+        m01 = ((b0[0] + b1[0]) / 2, (b0[1] + b1[1]) / 2)
+        m12 = ((b1[0] + b2[0]) / 2, (b1[1] + b2[1]) / 2)
+        m23 = ((b2[0] + b3[0]) / 2, (b2[1] + b3[1]) / 2)
+        m012 = ((m01[0] + m12[0]) / 2, (m01[1] + m12[1]) / 2)
+        m123 = ((m12[0] + m23[0]) / 2, (m12[1] + m23[1]) / 2)
+        m = ((m012[0] + m123[0]) / 2, (m012[1] + m123[1]) / 2)
+        tm = (t0 + t1) / 2
+        
+        # Правая половина кладётся первой, чтобы левая обработалась раньше
+        stack.append(((m, m123, m23, b3), tm, t1, depth + 1))
+        stack.append(((b0, m01, m012, m), t0, tm, depth + 1))
+    return pieces
+
+
 class ParametricAlgorithms:
-    def __init__(self, logger):
-        self.log = logger
+    def __init__(self, tracer):
+        self.trace = tracer
+        self.lines = LineAlgorithms(tracer)
+        
+        # Точки сегментов B-сплайна по их опорным точкам
+        self.segment_cache = {}
+        self.segment_steps = None
     
-    def hermite(self, p1, p4, r1, r4, steps=1000):
+    def hermite(self, p1, p4, r1, r4, steps=1000, tolerance=None):
         """Кубическая интерполяция Эрмита"""
-        # Матрица Эрмита
-        M = [
-            [2, -2, 1, 1],
-            [-3, 3, -2, -1],
-            [0, 0, 1, 0],
-            [1, 0, 0, 0]
-        ]
+        return list(self.hermite_iter(p1, p4, r1, r4, steps, tolerance))
+    
+    def hermite_iter(self, p1, p4, r1, r4, steps=1000, tolerance=None):
+        """Потоковая кубическая интерполяция Эрмита.
+        
+        С tolerance кривая строится адаптивно, и steps не используется.
+        """
+        self.trace.begin("hermite", p1, p4, r1, r4)
+        if tolerance is not None:
+            yield from self.adaptive_points("hermite", [hermite_to_bezier(p1, p4, r1, r4)], tolerance)
+            return
         
         # Вектор геометрии
         Gx = [p1[0], p4[0], r1[0], r4[0]]
         Gy = [p1[1], p4[1], r1[1], r4[1]]
         
-        points = []
-        for i in range(steps + 1):
-            t = i / steps
-            T = [t**3, t**2, t, 1]
-            
-            x = sum(T[i] * sum(M[i][j] * Gx[j] for j in range(4)) for i in range(4))
-            y = sum(T[i] * sum(M[i][j] * Gy[j] for j in range(4)) for i in range(4))
-            
-            points.append((round(x), round(y)))
-            self.log(f"Эрмит t={t:.2f}: ({x:.2f}, {y:.2f})")
-        
-        return points
+        x = evaluate_cubic(cubic_coefficients(HERMITE, Gx), steps)
+        y = evaluate_cubic(cubic_coefficients(HERMITE, Gy), steps)
+        yield from self.emit("hermite", x[None], y[None], steps)
     
-    def bezier(self, p1, p2, p3, p4, steps=1000):
+    def bezier(self, p1, p2, p3, p4, steps=1000, tolerance=None):
         """Кривая Безье"""
-        # Матрица Безье
-        M = [
-            [-1, 3, -3, 1],
-            [3, -6, 3, 0],
-            [-3, 3, 0, 0],
-            [1, 0, 0, 0]
-        ]
+        return list(self.bezier_iter(p1, p2, p3, p4, steps, tolerance))
+    
+    def bezier_iter(self, p1, p2, p3, p4, steps=1000, tolerance=None):
+        """Потоковое построение кривой Безье"""
+        self.trace.begin("bezier", p1, p2, p3, p4)
+        if tolerance is not None:
+            yield from self.adaptive_points("bezier", [[p1, p2, p3, p4]], tolerance)
+            return
         
         # Вектор геометрии
         Gx = [p1[0], p2[0], p3[0], p4[0]]
         Gy = [p1[1], p2[1], p3[1], p4[1]]
         
-        points = []
-        for i in range(steps + 1):
-            t = i / steps
-            T = [t**3, t**2, t, 1]
-            
-            x = sum(T[i] * sum(M[i][j] * Gx[j] for j in range(4)) for i in range(4))
-            y = sum(T[i] * sum(M[i][j] * Gy[j] for j in range(4)) for i in range(4))
-            
-            points.append((round(x), round(y)))
-            self.log(f"Безье t={t:.2f}: ({x:.2f}, {y:.2f})")
-        
-        return points
+        x = evaluate_cubic(cubic_coefficients(BEZIER, Gx), steps)
+        y = evaluate_cubic(cubic_coefficients(BEZIER, Gy), steps)
+        yield from self.emit("bezier", x[None], y[None], steps)
     
-    def bspline(self, points, steps=1000):
+    def bspline(self, points, steps=1000, tolerance=None, degree=3, knots=None):
         """B-сплайн"""
-        # Матрица B-сплайна
-        M = [
-            [-1, 3, -3, 1],
-            [3, -6, 3, 0],
-            [-3, 0, 3, 0],
-            [1, 4, 1, 0]
-        ]
+        return list(self.bspline_iter(points, steps, tolerance, degree, knots))
+    
+    def bspline_iter(self, points, steps=1000, tolerance=None, degree=3, knots=None):
+        """Потоковое построение B-сплайна по сегментам.
+        
+        Без knots строится однородный кубический сплайн в матричной форме.
+        Другая степень или узловой вектор knots вычисляются алгоритмом
+        де Бура. В обоих случаях сегменты считаются пакетами.
+        """
+        self.trace.begin("bspline", *points)
+        
+        n = len(points)
+        if degree < 1:
+            raise ValueError(f"Степень B-сплайна должна быть положительной, получено {degree}")
+        if n <= degree:
+            return
         
+        if degree != 3 or knots is not None:
+            if tolerance is not None:
+                raise ValueError("Адаптивное построение поддерживается только для однородного кубического B-сплайна")
+            yield from self.deboor_points(points, steps, degree, knots)
+            return
+        
+        if tolerance is not None:
+            beziers = [bspline_to_bezier(*points[i:i+4]) for i in range(n - 3)]
+            yield from self.adaptive_points("bspline", beziers, tolerance, segmented=True)
+            return
+        
+        block = max(1, BATCH_POINTS // (steps + 1))
+        for start in range(0, n - 3, block):
+            x, y = uniform_bspline(points, start, min(start + block, n - 3), steps)
+            yield from self.emit("bspline", x, y, steps, start)
+    
+    def bspline_segments(self, points, steps=1000):
+        """Однородный кубический B-сплайн по сегментам, без трассировки шагов.
+        
+        Сегмент зависит только от своих четырёх опорных точек, поэтому
+        хранится в кэше под ними: после перемещения одной точки заново
+        считаются лишь четыре использующих её сегмента. Возвращает массивы
+        координат (xs, ys) сегментов и их ключи.
+        """
+        self.trace.begin("bspline", *points)
+        keys = [tuple(points[i:i+4]) for i in range(len(points) - 3)]
+        if self.segment_steps != steps:
+            self.segment_cache = {}
+            self.segment_steps = steps
+        cache = self.segment_cache
+        
+        # Недостающие сегменты считаются пакетами из соседних сегментов
+        block = max(1, BATCH_POINTS // (steps + 1))
+        start = 0
+        while start < len(keys):
+            if keys[start] in cache:
+                start += 1
+                continue
+            stop = start + 1
+            while stop < len(keys) and stop - start < block and keys[stop] not in cache:
+                stop += 1
+            x, y = uniform_bspline(points, start, stop, steps)
+            xs = np.rint(x).astype(np.int32)
+            ys = np.rint(y).astype(np.int32)
+            for i in range(start, stop):
+                cache[keys[i]] = (xs[i - start], ys[i - start])
+            start = stop
+        
+        # В кэше остаются только сегменты текущего сплайна
+        self.segment_cache = {key: cache[key] for key in keys}
+        return [self.segment_cache[key] for key in keys], keys
+    
+    def deboor_points(self, points, steps, degree, knots):
+        """B-сплайн произвольной степени по узловому вектору (де Бур)"""
         n = len(points)
-        if n < 4:
-            return []
-        
-        all_points = []
-        for i in range(n - 3):
-            G = points[i:i+4]
-            Gx = [p[0] for p in G]
-            Gy = [p[1] for p in G]
-            
-            for j in range(steps + 1):
-                t = j / steps
-                T = [t**3, t**2, t, 1]
-                
-                x = sum(T[k] * sum(M[k][l] * Gx[l] for l in range(4)) for k in range(4)) / 6
-                y = sum(T[k] * sum(M[k][l] * Gy[l] for l in range(4)) for k in range(4)) / 6
-                
-                all_points.append((round(x), round(y)))
-                self.log(f"B-сплайн сегмент {i}, t={t:.2f}: ({x:.2f}, {y:.2f})")
-        
-        return all_points
\ No newline at end of file
+        if knots is None:
+            knots = uniform_knots(n, degree)
+        if len(knots) != n + degree + 1 or any(a > b for a, b in zip(knots, knots[1:])):
+            raise ValueError(f"Нужен неубывающий узловой вектор из {n + degree + 1} значений")
+        
+        # Сегменты - непустые интервалы узлов внутри области определения
+        spans = [k for k in range(degree, n) if knots[k] < knots[k + 1]]
+        knots = np.asarray(knots, dtype=np.float64)
+        local = powers(steps)[2]
+        
+        block = max(1, BATCH_POINTS // (steps + 1))
+        for start in range(0, len(spans), block):
+            chunk = np.array(spans[start:start + block])
+            ts = knots[chunk, None] + (knots[chunk + 1] - knots[chunk])[:, None] * local
+            xy = de_boor(points, degree, knots, ts.ravel(), np.repeat(chunk, steps + 1))
+            shape = (len(chunk), steps + 1)
+            yield from self.emit("bspline", xy[:, 0].reshape(shape), xy[:, 1].reshape(shape), steps, start)
+    
+    def emit(self, kind, x, y, steps, first=None):
+        """Точки сегментов: x и y содержат по строке из steps + 1 значений на
+        сегмент, first - номер первого сегмента B-сплайна в пакете"""
+        points = zip(np.rint(x).astype(np.int64).ravel().tolist(), np.rint(y).astype(np.int64).ravel().tolist())
+        
+        if not self.trace.steps:
+            yield from points
+            return
+        
+        # Номер шага продолжает нумерацию предыдущих сегментов
+        trace = self.trace.step
+        count = steps + 1
+        ts = powers(steps)[2].tolist()
+        base = 0 if first is None else first * count
+        coords = zip(points, x.ravel().tolist(), y.ravel().tolist())
+        for index, (point, px, py) in enumerate(coords, base):
+            extra = () if first is None else (index // count,)
+            trace(kind, index, px, py, ts[index % count], *extra)
+            yield point
+    
+    def adaptive_points(self, kind, beziers, tolerance, segmented=False):
+        """Адаптивное построение: плоские куски кривых Безье растеризуются
+        Брезенхемом, пиксель на стыке кусков выдаётся один раз"""
+        pieces = [(segment,) + piece for segment, bezier in enumerate(beziers)
+                  for piece in flatten(bezier, tolerance)]
+        ends = np.rint([(b0[0], b0[1], b3[0], b3[1]) for _, b0, b3, _, _ in pieces]).astype(np.int64)
+        xs, ys, _, offsets = self.lines.bresenham_batch(ends)
+        
+        counts = np.diff(offsets)
+        piece = np.repeat(np.arange(len(pieces)), counts)
+        k = np.arange(len(xs)) - offsets[piece]
+        
+        # Брезенхем идёт по возрастанию большей оси; куски, направленные
+        # против неё, разворачиваем, чтобы пиксели шли вдоль кривой
+        first = offsets[:-1]
+        reverse = (xs[first] != ends[:, 0]) | (ys[first] != ends[:, 1])
+        order = np.where(reverse[piece], offsets[piece + 1] - 1 - k, offsets[piece] + k)
+        xs, ys = xs[order], ys[order]
+        
+        keep = np.ones(len(xs), dtype=bool)
+        keep[1:] = (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])
+        points = zip(xs[keep].tolist(), ys[keep].tolist())
+        
+        if not self.trace.steps:
+            yield from points
+            return
+        
+        # Параметр пикселя интерполируется внутри его куска
+        t0 = np.array([p[3] for p in pieces])
+        t1 = np.array([p[4] for p in pieces])
+        ts = t0[piece] + (t1 - t0)[piece] * k / np.maximum(counts[piece] - 1, 1)
+        segments = np.array([p[0] for p in pieces])[piece]
+        
+        trace = self.trace.step
+        for index, (point, t, segment) in enumerate(zip(points, ts[keep].tolist(), segments[keep].tolist())):
+            extra = (segment,) if segmented else ()
+            trace(kind, index, point[0], point[1], t, *extra)
+            yield point
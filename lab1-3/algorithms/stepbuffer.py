@@ -0,0 +1,86 @@
+import numpy as np
+
+from algorithms.stream import chunked
+
+# Шаг построения: координаты пикселя и интенсивность, 12 байт
+STEP = np.dtype([("x", np.int32), ("y", np.int32), ("intensity", np.float32)])
+
+# Сколько точек забирать из потока алгоритма за раз
+CHUNK_SIZE = 256
+
+
+def to_arrays(points):
+    """Список точек (x, y) или (x, y, интенсивность) -> массивы xs, ys, intensity"""
+    data = np.array(points, dtype=np.float64).reshape(len(points), -1)
+    intensity = data[:, 2] if data.shape[1] > 2 else np.ones(len(data))
+    return data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), intensity
+
+
+def array_chunks(points, size=CHUNK_SIZE):
+    """Поток точек алгоритма -> поток пакетов (xs, ys, intensity)"""
+    for chunk in chunked(points, size):
+        yield to_arrays(chunk)
+
+
+class StepBuffer:
+    """Шаги построения в структурированном массиве NumPy.
+    
+    Массив растёт удвоением, шаг занимает 12 байт вместо кортежа из трёх
+    объектов Python. Отдельный шаг читается как кортеж (x, y, интенсивность),
+    диапазоны - как массивы без копирования.
+    """
+    
+    def __init__(self, capacity=1024):
+        self.data = np.empty(capacity, dtype=STEP)
+        self.size = 0
+    
+    @classmethod
+    def from_arrays(cls, xs, ys, intensity=1):
+        buffer = cls(max(len(xs), 1))
+        buffer.append(xs, ys, intensity)
+        return buffer
+    
+    @classmethod
+    def wrap(cls, data):
+        """Буфер поверх готового массива записей (например, np.memmap) без копирования"""
+        buffer = cls(0)
+        buffer.data = data
+        buffer.size = len(data)
+        return buffer
+    
+    def __len__(self):
+        return self.size
+    
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        x, y, intensity = self.data[index].tolist()
+        return (x, y, intensity)
+    
+    def reserve(self, size):
+        if size > len(self.data):
+            data = np.empty(max(size, 2 * len(self.data)), dtype=STEP)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+    
+    def append(self, xs, ys, intensity=1):
+        """Добавляет пакет шагов из массивов координат и интенсивностей"""
+        count = len(xs)
+        self.reserve(self.size + count)
+        view = self.data[self.size:self.size + count]
+        view["x"] = xs
+        view["y"] = ys
+        view["intensity"] = intensity
+        self.size += count
+    
+    def replace(self, start, xs, ys, intensity=1):
+        """Заменяет шаги начиная со start"""
+        view = self.data[start:start + len(xs)]
+        view["x"] = xs
+        view["y"] = ys
+        view["intensity"] = intensity
+    
+    def arrays(self, start=0, end=None):
+        """Шаги start..end-1 в виде массивов xs, ys, intensity (без копирования)"""
+        view = self.data[start:self.size if end is None else min(end, self.size)]
+        return view["x"], view["y"], view["intensity"]
@@ -0,0 +1,10 @@
+from itertools import islice
+
+def chunked(points, size):
+    """Разбивает поток точек на списки фиксированного размера (последний короче)"""
+    points = iter(points)
+    while True:
+        chunk = list(islice(points, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,89 @@
+OFF = 0
+SUMMARY = 1
+STEPS = 2
+
+# Шаблоны сообщений. Записи хранятся как кортежи (вид, номер шага, ...)
+# и превращаются в строки только при чтении.
+FORMATS = {
+    "dda": "ЦДА шаг {0}: ({1}, {2})",
+    "bresenham": "Брезенхем шаг {0}: ({1}, {2})",
+    "wu": "Ву шаг {0}: пиксель ({1}, {2}), интенсивность {3:.2f}",
+    "circle": "Окружность: точка {0} ({1}, {2})",
+    "ellipse": "Эллипс: точка {0} ({1}, {2})",
+    "hyperbola": "Гипербола: точка {0} ({1}, {2})",
+    "parabola": "Парабола: точка {0} ({1}, {2})",
+    "hermite": "Эрмит шаг {0}, t={3:.2f}: ({1:.2f}, {2:.2f})",
+    "bezier": "Безье шаг {0}, t={3:.2f}: ({1:.2f}, {2:.2f})",
+    "bspline": "B-сплайн шаг {0}, сегмент {4}, t={3:.2f}: ({1:.2f}, {2:.2f})",
+}
+
+NAMES = {
+    "dda": "ЦДА",
+    "bresenham": "Брезенхем",
+    "wu": "Ву",
+    "circle": "Окружность",
+    "ellipse": "Эллипс",
+    "hyperbola": "Гипербола",
+    "parabola": "Парабола",
+    "hermite": "Эрмит",
+    "bezier": "Безье",
+    "bspline": "B-сплайн",
+}
+
+BEGIN = "begin"
+
+
+class Tracer:
+    """Трассировка алгоритмов в кольцевой буфер.
+    
+    Алгоритмы проверяют флаг steps один раз перед циклом, поэтому при
+    выключенной трассировке шаги не стоят ничего. Записи нумеруются
+    сквозным счётчиком: запись шага i текущего построения лежит под
+    номером base + i, пока её не вытеснили более новые.
+    """
+    
+    def __init__(self, level=OFF, capacity=10000):
+        self.capacity = capacity
+        self._buffer = [None] * capacity
+        self.count = 0
+        self.base = 0
+        self.header = None
+        self.set_level(level)
+    
+    def set_level(self, level):
+        self.level = level
+        self.enabled = level >= SUMMARY
+        self.steps = level >= STEPS
+    
+    def begin(self, kind, *params):
+        """Начало построения примитива"""
+        if self.enabled:
+            self.header = (BEGIN, kind) + params
+            self._push(self.header)
+        self.base = self.count
+    
+    def step(self, kind, *args):
+        """Сырая запись шага: номер, координаты и данные алгоритма"""
+        self._buffer[self.count % self.capacity] = (kind,) + args
+        self.count += 1
+    
+    def _push(self, record):
+        self._buffer[self.count % self.capacity] = record
+        self.count += 1
+    
+    def lookup(self, index):
+        """Запись шага index текущего построения или None"""
+        seq = self.base + index
+        if seq >= self.count or seq < self.count - self.capacity:
+            return None
+        record = self._buffer[seq % self.capacity]
+        if record[0] == BEGIN or record[1] != index:
+            return None
+        return record
+    
+    def format(self, record):
+        kind = record[0]
+        if kind == BEGIN:
+            params = ", ".join(str(p) for p in record[2:])
+            return f"{NAMES[record[1]]}: параметры ({params})"
+        return FORMATS[kind].format(*record[1:])
@@ -0,0 +1,239 @@
+"""Замеры производительности алгоритмов lab1-3.
+
+Каждый алгоритм прогоняется на наборе нагрузок (короткие и длинные
+отрезки, малые и большие радиусы, B-сплайны от 4 до 10 000 опорных
+точек) с выключенной и включённой трассировкой. Для каждой нагрузки
+выводятся пиксели в секунду и пиковая память.
+    
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from algorithms.line import LineAlgorithms
+from algorithms.curve import CurveAlgorithms
+from algorithms.parametric import ParametricAlgorithms, clamped_knots
+from algorithms.trace import Tracer, OFF, STEPS
+from managers.framebuffer import FrameBuffer
+from managers.coverage import CoverageBuffer
+
+
+def make_algorithms(level):
+    tracer = Tracer(level)
+    return SimpleNamespace(
+        line=LineAlgorithms(tracer),
+        curve=CurveAlgorithms(tracer),
+        parametric=ParametricAlgorithms(tracer),
+    )
+
+
+def segments(length, count, seed):
+    """Отрезки заданной длины со случайным направлением"""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        x1, y1 = rng.randint(0, 800), rng.randint(0, 600)
+        dx = rng.randint(-length, length)
+        dy = rng.choice((-1, 1)) * (length - abs(dx))
+        result.append((x1, y1, x1 + dx, y1 + dy))
+    return result
+
+
+def control_points(count, seed):
+    rng = random.Random(seed)
+    return [(rng.randint(0, 800), rng.randint(0, 600)) for _ in range(count)]
+
+
+def line_workload(method, data):
+    def run(algos):
+        return sum(len(getattr(algos.line, method)(*s)) for s in data)
+    return run
+
+
+def batch_workload(method, data, **kwargs):
+    def run(algos):
+        return len(getattr(algos.line, method)(data, **kwargs)[0])
+    return run
+
+
+def wu_frame_workload(blend, data):
+    """Пакет отрезков Ву в кадре: наложение по очереди или буфер покрытия"""
+    def run(algos):
+        xs, ys, intensity, _ = algos.line.wu_batch(data)
+        framebuffer = FrameBuffer(800, 600)
+        if blend is None:
+            framebuffer.composite(xs, ys, intensity)
+        else:
+            coverage = CoverageBuffer(800, 600, blend)
+            coverage.accumulate(xs, ys, intensity)
+            coverage.resolve(framebuffer)
+        return len(xs)
+    return run
+
+
+def call_workload(group, method, *args, **kwargs):
+    def run(algos):
+        return len(getattr(getattr(algos, group), method)(*args, **kwargs))
+    return run
+
+
+def build_workloads():
+    """Нагрузки: имя -> функция, возвращающая число построенных пикселей"""
+    workloads = {}
+    for size, length, count in (("short", 10, 2000), ("long", 700, 50)):
+        data = segments(length, count, seed=length)
+        for method in ("dda", "bresenham", "wu"):
+            workloads[f"line/{method}/{size}"] = line_workload(method, data)
+            workloads[f"line/{method}_batch/{size}"] = batch_workload(method + "_batch", data)
+    
+    # Длинные отрезки, почти целиком лежащие за пределами кадра 800x600
+    data = segments(20000, 200, seed=21)
+    for method in ("dda", "bresenham", "wu"):
+        workloads[f"line/{method}_batch/offscreen"] = batch_workload(method + "_batch", data)
+        workloads[f"line/{method}_batch/offscreen/clipped"] = batch_workload(
+            method + "_batch", data, width=800, height=600)
+    
+    # Ломаная из 100 000 вершин (случайное блуждание) одним пакетом
+    rng = random.Random(22)
+    walk = [(400, 300)]
+    for _ in range(100000):
+        walk.append((walk[-1][0] + rng.randint(-3, 3), walk[-1][1] + rng.randint(-3, 3)))
+    for method in ("bresenham", "wu"):
+        workloads[f"line/{method}_polyline/100000"] = batch_workload(method + "_polyline", walk)
+    
+    # Плотный набор сглаженных отрезков, выведенный в кадр
+    data = segments(700, 2000, seed=20)
+    for blend in (None, "max", "add"):
+        workloads[f"frame/wu/dense/{blend or 'over'}"] = wu_frame_workload(blend, data)
+    
+    # Гипербола и парабола строятся только в пределах области, поэтому большие
+    # кривые получают область 8000 x 6000 с центром кривой посередине
+    for size, r, (width, height) in (("small", 10, (800, 600)), ("huge", 2000, (8000, 6000))):
+        xc, yc = width // 2, height // 2
+        workloads[f"curve/circle/{size}"] = call_workload("curve", "circle", 400, 300, r)
+        workloads[f"curve/ellipse/{size}"] = call_workload("curve", "ellipse", 400, 300, r, r // 2)
+        workloads[f"curve/hyperbola/{size}"] = call_workload("curve", "hyperbola", xc, yc, r, r // 2, width, height)
+        workloads[f"curve/parabola/{size}"] = call_workload("curve", "parabola", xc, yc, r, width, height)
+    
+    p = control_points(4, seed=4)
+    workloads["parametric/hermite"] = call_workload("parametric", "hermite", p[0], p[1], (300, 0), (0, 300))
+    workloads["parametric/bezier"] = call_workload("parametric", "bezier", *p)
+    
+    # Для длинных сплайнов шагов на сегмент меньше, иначе прогон занимает минуты
+    for count, steps in ((4, 1000), (100, 1000), (1000, 100), (10000, 10)):
+        workloads[f"parametric/bspline/{count}"] = call_workload(
+            "parametric", "bspline", control_points(count, seed=count), steps=steps)
+    
+    # Произвольная степень и узловой вектор (алгоритм де Бура)
+    workloads["parametric/bspline/1000/deboor-5"] = call_workload(
+        "parametric", "bspline", control_points(1000, seed=1000), steps=100, degree=5, knots=clamped_knots(1000, 5))
+    
+    # Адаптивное разбиение: работа зависит от длины кривой, а не от steps
+    workloads["parametric/bezier/adaptive"] = call_workload("parametric", "bezier", *p, tolerance=0.5)
+    for count in (100, 1000):
+        workloads[f"parametric/bspline/{count}/adaptive"] = call_workload(
+            "parametric", "bspline", control_points(count, seed=count), tolerance=0.5)
+    return workloads
+
+
+def measure(run, level, repeat):
+    """Лучшее время из repeat прогонов и пиковая память отдельного прогона"""
+    algos = make_algorithms(level)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pixels = run(algos)
+        best = min(best, time.perf_counter() - start)
+    
+    tracemalloc.start()
+    run(make_algorithms(level))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        "pixels": pixels,
+        "seconds": best,
+        # Слишком быстрый прогон скорости не даёт: None, а не бесконечность,
+        # которую json записал бы нестандартным Infinity
+        "pixels_per_sec": pixels / best if best > 0 else None,
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_all(name_filter=None, repeat=3):
+    results = {}
+    for name, run in build_workloads().items():
+        if name_filter and name_filter not in name:
+            continue
+        for label, level in (("trace-off", OFF), ("trace-on", STEPS)):
+            key = f"{name}/{label}"
+            results[key] = measure(run, level, repeat)
+            r = results[key]
+            rate = f"{r['pixels_per_sec']:>14,.0f}" if r["pixels_per_sec"] is not None else f"{'-':>14}"
+            print(f"{key:42} {r['pixels']:>10} пкс {rate} пкс/с {r['peak_kb']:>10,.0f} КБ")
+    return results
+
+
+def comparable(rate):
+    """Годится ли скорость для сравнения: конечное положительное число"""
+    return isinstance(rate, (int, float)) and math.isfinite(rate) and rate > 0
+
+
+def compare(results, baseline, threshold):
+    """Нагрузки, скорость которых упала больше чем на threshold, и нагрузки,
+    скорости которых сравнить нельзя (нулевая, бесконечная или пустая)"""
+    regressions = []
+    skipped = []
+    for key, base in baseline.items():
+        current = results.get(key)
+        if current is None:
+            continue
+        # Нулевая текущая скорость при нормальной базовой - настоящее замедление
+        rate = current["pixels_per_sec"]
+        if not comparable(base.get("pixels_per_sec")) or not (rate == 0 or comparable(rate)):
+            skipped.append(key)
+            continue
+        ratio = rate / base["pixels_per_sec"]
+        if ratio < 1 - threshold:
+            regressions.append((key, ratio))
+    return regressions, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности алгоритмов lab1-3")
+    parser.add_argument("--filter", help="запускать только нагрузки, имя которых содержит строку")
+    parser.add_argument("--repeat", type=int, default=3, help="число прогонов каждой нагрузки")
+    parser.add_argument("--save", metavar="FILE", help="сохранить результаты как базовые (JSON)")
+    parser.add_argument("--compare", metavar="FILE", help="сравнить с базовыми результатами (JSON)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление (доля)")
+    args = parser.parse_args()
+    
+    results = run_all(args.filter, args.repeat)
+    
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.save}")
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, skipped = compare(results, baseline, args.threshold)
+        for key in skipped:
+            print(f"ПРОПУЩЕНО {key}: скорость нельзя сравнить с базовой")
+        for key, ratio in regressions:
+            print(f"ЗАМЕДЛЕНИЕ {key}: {ratio:.0%} от базовой скорости")
+        if regressions:
+            sys.exit(1)
+        print("Замедлений сверх порога нет")
+
+
+if __name__ == "__main__":
+    main()
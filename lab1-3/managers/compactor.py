@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class StepCompactor:
+    """Удаление повторов пикселей из потока шагов.
+    
+    Пиксель выводится один раз, на месте первого появления; из повторов
+    берётся наибольшая интенсивность. Для каждого оставшегося шага
+    хранится номер исходного шага алгоритма, чтобы отладка могла найти
+    его запись трассировки.
+    
+    Позиции пикселей кадра width x height хранятся в сетке, поэтому пакет
+    обрабатывается векторно; пиксели за пределами кадра - через словарь.
+    """
+    
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.owner = np.full(width * height, -1, dtype=np.int64)
+        self.outside = {}
+        self.origin = []
+        self.consumed = 0
+    
+    def feed(self, xs, ys, intensity, steps):
+        """Добавляет пакет шагов в буфер steps без повторов.
+        
+        Возвращает позиции шагов из прежних пакетов, у которых выросла
+        интенсивность.
+        """
+        n = len(xs)
+        base = len(steps)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        cells = np.where(inside, ys * self.width + xs, 0)
+        
+        # Новый пиксель - первое в пакете появление ещё не встречавшейся ячейки
+        new = np.zeros(n, dtype=bool)
+        index = np.nonzero(inside)[0]
+        unique, first = np.unique(cells[index], return_index=True)
+        new[index[first[self.owner[unique] < 0]]] = True
+        
+        outside = np.nonzero(~inside)[0]
+        fresh = set()
+        for i, key in zip(outside.tolist(), zip(xs[outside].tolist(), ys[outside].tolist())):
+            if key not in self.outside and key not in fresh:
+                fresh.add(key)
+                new[i] = True
+        
+        # Позиции новых шагов в буфере
+        added = np.nonzero(new)[0]
+        positions = base + np.arange(len(added))
+        added_inside = inside[added]
+        self.owner[cells[added[added_inside]]] = positions[added_inside]
+        for i, pos in zip(added[~added_inside].tolist(), positions[~added_inside].tolist()):
+            self.outside[(int(xs[i]), int(ys[i]))] = pos
+        
+        steps.append(xs[added], ys[added], intensity[added])
+        self.origin.extend((self.consumed + added).tolist())
+        self.consumed += n
+        
+        # Повторы поднимают интенсивность уже добавленного шага до наибольшей
+        repeat = np.nonzero(~new)[0]
+        if not len(repeat):
+            return []
+        target = np.empty(len(repeat), dtype=np.int64)
+        repeat_inside = inside[repeat]
+        target[repeat_inside] = self.owner[cells[repeat[repeat_inside]]]
+        target[~repeat_inside] = [self.outside[(int(xs[i]), int(ys[i]))] for i in repeat[~repeat_inside].tolist()]
+        
+        _, _, values = steps.arrays()
+        before = values[target].copy()
+        np.maximum.at(values, target, intensity[repeat].astype(values.dtype))
+        raised = np.unique(target[values[target] > before])
+        return raised[raised < base].tolist()
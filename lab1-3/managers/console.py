@@ -0,0 +1,58 @@
+class ConsoleSink:
+    """Буферизованный вывод сообщений в текстовое поле консоли.
+    
+    Сообщения копятся и выводятся одной вставкой через after_idle. В поле
+    хранится не больше max_lines строк, старые удаляются. В режиме записи
+    в файл сообщения идут на диск, минуя поле.
+    """
+    
+    def __init__(self, root, text, max_lines=1000):
+        self.root = root
+        self.text = text
+        self.max_lines = max_lines
+        self.pending = []
+        self.flush_id = None
+        self.lines = 0
+        self.file = None
+    
+    def write(self, message):
+        if self.file is not None:
+            self.file.write(message + "\n")
+            return
+        self.pending.append(message)
+        if self.flush_id is None:
+            self.flush_id = self.root.after_idle(self.flush)
+    
+    def flush(self):
+        self.flush_id = None
+        if not self.pending:
+            return
+        
+        # Всё, что не поместится в лимит, сразу отбрасываем
+        lines = "\n".join(self.pending).split("\n")[-self.max_lines:]
+        self.pending = []
+        
+        self.text.config(state='normal')
+        self.text.insert('end', "\n".join(lines) + "\n")
+        self.lines += len(lines)
+        if self.lines > self.max_lines:
+            excess = self.lines - self.max_lines
+            self.text.delete('1.0', f'{excess + 1}.0')
+            self.lines = self.max_lines
+        self.text.config(state='disabled')
+        self.text.see('end')
+    
+    @property
+    def streaming(self):
+        return self.file is not None
+    
+    def stream_to(self, path):
+        """Переключает вывод в файл; в начало файла попадает текущее содержимое поля"""
+        self.flush()
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write(self.text.get('1.0', 'end-1c'))
+    
+    def stop_streaming(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
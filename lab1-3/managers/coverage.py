@@ -0,0 +1,59 @@
+import numpy as np
+
+# Способы сложения покрытия пикселя несколькими примитивами
+BLEND_MODES = ("max", "add")
+
+
+class CoverageBuffer:
+    """Буфер покрытия пикселей (float32) для сглаженных построений.
+    
+    Покрытие копится по всем примитивам: "max" оставляет наибольшее,
+    "add" складывает с ограничением единицей. Так пересекающиеся
+    сглаженные отрезки не затирают друг друга, а готовый кадр получается
+    одним наложением покрытия на буфер кадра.
+    """
+    
+    def __init__(self, width, height, blend="max"):
+        if blend not in BLEND_MODES:
+            raise ValueError(f"Неизвестный способ сложения покрытия {blend!r}")
+        self.width = width
+        self.height = height
+        self.blend = blend
+        self.coverage = np.zeros((height, width), dtype=np.float32)
+    
+    def clear(self):
+        self.coverage[...] = 0
+    
+    def accumulate(self, xs, ys, intensity):
+        """Добавляет покрытие пакета пикселей; повторы ячейки в пакете
+        складываются тем же способом, что и разные пакеты"""
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        values = np.clip(np.broadcast_to(np.asarray(intensity, dtype=np.float32), xs.shape), 0, 1)
+        
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        if not inside.all():
+            xs, ys, values = xs[inside], ys[inside], values[inside]
+        if not len(xs):
+            return
+        
+        cells = ys * self.width + xs
+        flat = self.coverage.reshape(-1)
+        if self.blend == "max":
+            np.maximum.at(flat, cells, values)
+        else:
+            np.add.at(flat, cells, values)
+            flat[cells] = np.minimum(flat[cells], 1)
+    
+    def resolve(self, framebuffer, color=(0, 0, 0)):
+        """Накладывает накопленное покрытие на буфер кадра как альфу цвета color
+        (оператор over, как FrameBuffer.composite)"""
+        cells = np.flatnonzero(self.coverage)
+        alpha = self.coverage.reshape(-1)[cells].astype(np.float64)
+        
+        # Ячейки различны, поэтому наложение сводится к смешиванию
+        flat = framebuffer.pixels.reshape(-1, 4)
+        px = flat[cells].astype(np.float64)
+        px[:, :3] = px[:, :3] * (1 - alpha)[:, None] + np.asarray(color) * alpha[:, None]
+        px[:, 3] = 255 - (255 - px[:, 3]) * (1 - alpha)
+        flat[cells] = np.rint(px).astype(np.uint8)
@@ -1,5 +1,21 @@
+import os
+import time
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog
+
+from algorithms.trace import SUMMARY, STEPS
+from algorithms.stepbuffer import StepBuffer
+from managers.renderer import ItemRenderer, FrameRenderer
+from managers.console import ConsoleSink
+from managers.compactor import StepCompactor
+from managers.tracefile import write_trace, read_trace
+
+# Сколько строк хранит консоль
+CONSOLE_MAX_LINES = 1000
+
+# Кадров анимации в секунду и время на продвижение и вывод шагов за кадр (с)
+ANIMATION_FPS = 60
+FRAME_BUDGET = 0.010
 
 class DebugManager:
     def __init__(self, editor):
@@ -7,13 +23,33 @@ class DebugManager:
         self.debug_mode = False
         self.animation_speed = 0
         self.animation_id = None
-        self.steps = []
+        self.steps = StepBuffer()
         self.step_index = 0
+        self.stream = None
+        
+        # Начало анимации (время и шаг) и предел шагов за кадр
+        self.animation_start = 0
+        self.animation_from = 0
+        self.frame_steps = 1
+        
+        # Удаление повторов пикселей из потока шагов алгоритма
+        self.compactor = None
+        
+        # Вывод шагов: буфер кадра или попиксельные объекты холста
+        self.renderer = None
         
         # Элементы интерфейса
         self.debug_btn = None
         self.speed_entry = None
+        self.rate_label = None
         self.console = None
+        self.sink = None
+        self.log_file_btn = None
+        self.items_var = None
+        self.compact_var = None
+        self.seek_entry = None
+        self.profile_var = None
+        self.profile_file_btn = None
     
     def setup_controls(self):
         # Кнопка отладки
@@ -25,58 +61,205 @@ class DebugManager:
         ttk.Button(self.editor.root, text="Шаг назад", command=self.step_backward).grid(row=3, column=3, sticky="ew")
         
         # Поле скорости
-        self.speed_entry = ttk.Entry(self.editor.root, width=5)
+        self.speed_entry = ttk.Entry(self.editor.root, width=9)
         self.speed_entry.insert(0, "0")
         ttk.Label(self.editor.root, text="Скорость (пкс/с):").grid(row=3, column=4, sticky='e')
         self.speed_entry.grid(row=3, column=5, sticky="w", padx=5)
         
+        # Достигнутая скорость анимации против заданной
+        self.rate_label = ttk.Label(self.editor.root, text="")
+        self.rate_label.grid(row=4, column=5, sticky="w", padx=5)
         
+        # Попиксельные объекты холста удобны для небольших построений
+        self.items_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.editor.root, text="Попиксельная отрисовка", variable=self.items_var,
+                        command=self.refresh).grid(row=4, column=0, columnspan=2, sticky="w")
+        
+        # Повторно закрашенные пиксели выводятся один раз
+        self.compact_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.editor.root, text="Без повторов пикселей", variable=self.compact_var,
+                        command=self.toggle_compact).grid(row=4, column=3, columnspan=2, sticky="w")
+        
+
         # Консоль
         self.console = tk.Text(self.editor.root, height=10, state='disabled')
         self.console.grid(row=2, column=0, columnspan=6, sticky="ew")
+        self.sink = ConsoleSink(self.editor.root, self.console, CONSOLE_MAX_LINES)
+        
+        # Запись лога в файл вместо консоли
+        self.log_file_btn = ttk.Button(self.editor.root, text="Лог в файл", command=self.toggle_log_file)
+        self.log_file_btn.grid(row=4, column=2, sticky="ew")
+        
+        # Запись шагов построения в файл и воспроизведение из файла
+        ttk.Button(self.editor.root, text="Записать трассу", command=self.record_trace).grid(row=5, column=0, sticky="ew")
+        ttk.Button(self.editor.root, text="Открыть трассу", command=self.open_trace).grid(row=5, column=1, sticky="ew")
+        
+        # Переход к произвольному шагу
+        self.seek_entry = ttk.Entry(self.editor.root, width=9)
+        self.seek_entry.insert(0, "0")
+        ttk.Label(self.editor.root, text="Шаг:").grid(row=5, column=2, sticky='e')
+        self.seek_entry.grid(row=5, column=3, sticky="w", padx=5)
+        ttk.Button(self.editor.root, text="Перейти к шагу", command=self.go_to_step).grid(row=5, column=4, sticky="ew")
+        
+        # Замер времени построений по фазам и запись замеров в файл
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.editor.root, text="Профилирование", variable=self.profile_var,
+                        command=self.toggle_profile).grid(row=6, column=0, columnspan=2, sticky="w")
+        self.profile_file_btn = ttk.Button(self.editor.root, text="Профиль в файл", command=self.toggle_profile_file)
+        self.profile_file_btn.grid(row=6, column=2, sticky="ew")
     
     def set_steps(self, steps):
-        self.steps = steps
+        """Шаги построения: готовый буфер StepBuffer или поток пакетов
+        массивов (xs, ys, intensity).
+        
+        Из потока повторы пикселей удаляются, если это включено; готовый
+        буфер выводится как есть.
+        """
+        self.compactor = None
+        if isinstance(steps, StepBuffer):
+            self.steps = steps
+            self.stream = None
+        else:
+            self.steps = StepBuffer()
+            self.stream = iter(steps)
+            if self.compacting():
+                with self.editor.draw.profiler.phase("conversion"):
+                    self.compactor = StepCompactor(self.editor.draw.width, self.editor.draw.height)
         self.step_index = 0
+        self.reset_render()
         self.update_display()
     
+    def compacting(self):
+        """Удаляются ли повторы пикселей из потока шагов"""
+        return self.compact_var is None or self.compact_var.get()
+    
+    def ensure(self, index):
+        """Дочитывает поток до шага index, возвращает True, если шаг существует"""
+        profiler = self.editor.draw.profiler
+        while index >= len(self.steps) and self.stream is not None:
+            chunk = next(self.stream, None)
+            if chunk is None:
+                self.stream = None
+                continue
+            
+            with profiler.phase("conversion"):
+                if self.compactor is None:
+                    self.steps.append(*chunk)
+                    continue
+                raised = self.compactor.feed(*chunk, self.steps)
+            
+            # Выведенные пиксели, у которых выросла интенсивность, обновляются
+            shown = [pos for pos in raised if self.renderer is not None and pos < self.renderer.drawn]
+            if shown:
+                self.update_render(self.renderer, min(shown), max(shown) + 1)
+        return index < len(self.steps)
+    
+    def origin(self, index):
+        """Номер исходного шага алгоритма для шага index"""
+        if self.compactor is None:
+            return index
+        return self.compactor.origin[index]
+    
+    def replace_steps(self, start, xs, ys, intensity=1):
+        """Заменяет шаги начиная со start и перерисовывает только их"""
+        with self.editor.draw.profiler.phase("conversion"):
+            self.steps.replace(start, xs, ys, intensity)
+        self.update_render(self.get_renderer(), start, start + len(xs))
+    
     def toggle_debug(self):
         self.debug_mode = not self.debug_mode
         status = "включен" if self.debug_mode else "выключен"
         self.debug_btn.config(text=f"Режим отладки ({status})")
         self.log_message(f"Режим отладки {status}")
         
+        # Пошаговые записи трассировки нужны только в режиме отладки
+        self.editor.draw.tracer.set_level(STEPS if self.debug_mode else SUMMARY)
+        
         if self.debug_mode:
+            self.editor.draw.try_draw()
             self.start_animation()
         else:
             self.stop_animation()
             self.draw_all_steps()
     
     def start_animation(self):
-        self.stop_animation()
+        # Перезапуск анимации продолжает замер того же построения
+        self.cancel_animation()
         self.animation_speed = self.get_speed()
         
-        if self.animation_speed > 0 and self.step_index < len(self.steps) - 1:
-            delay = int(1000 / self.animation_speed)
-            self.animation_id = self.editor.root.after(delay, self.animation_step)
+        if self.animation_speed > 0 and self.ensure(self.step_index + 1):
+            self.animation_start = time.perf_counter()
+            self.animation_from = self.step_index
+            self.frame_steps = max(1, self.animation_speed // ANIMATION_FPS)
+            self.animation_id = self.editor.root.after(self.frame_delay(), self.animation_step)
+    
+    def frame_delay(self):
+        """Пауза между кадрами: при скорости ниже ANIMATION_FPS кадр на шаг"""
+        return max(1, int(1000 / min(self.animation_speed, ANIMATION_FPS)))
     
     def animation_step(self):
-        if self.step_index < len(self.steps) - 1:
-            self.step_forward()
-            if self.step_index < len(self.steps) - 1:
-                delay = int(1000 / self.animation_speed)
-                self.animation_id = self.editor.root.after(delay, self.animation_step)
+        """Кадр анимации: продвигается до шага, которого требует скорость
+        к текущему моменту, но не дальше предела шагов за кадр.
+        
+        Предел подстраивается так, чтобы продвижение и вывод кадра занимали
+        около FRAME_BUDGET; если алгоритм или вывод не успевают, анимация
+        идёт медленнее заданной скорости, а интерфейс остаётся отзывчивым.
+        """
+        self.animation_id = None
+        self.editor.draw.profiler.resume()
+        now = time.perf_counter()
+        target = self.animation_from + max(1, int((now - self.animation_start) * self.animation_speed))
+        target = min(target, self.step_index + self.frame_steps)
+        
+        # Поток дочитывается пакетами, пока хватает времени кадра
+        start = self.step_index
+        index = start
+        while index < target and time.perf_counter() - now < FRAME_BUDGET:
+            if not self.ensure(index + 1):
+                break
+            index = min(target, len(self.steps) - 1)
+        
+        if index > start:
+            self.step_index = index
+            self.redraw_current()
+            work = time.perf_counter() - now
+            self.frame_steps = max(1, int((index - start) * FRAME_BUDGET / max(work, 1e-6)))
+        rate = self.show_rate()
+        
+        if self.ensure(self.step_index + 1):
+            self.animation_id = self.editor.root.after(self.frame_delay(), self.animation_step)
+            self.editor.draw.profiler.pause()
+        else:
+            self.log_message(f"Достигнут конец построения, скорость анимации {rate}")
+            self.editor.draw.finish_profile()
+    
+    def show_rate(self):
+        """Достигнутая скорость анимации (шагов в секунду) против заданной"""
+        elapsed = time.perf_counter() - self.animation_start
+        rate = (self.step_index - self.animation_from) / elapsed if elapsed > 0 else 0
+        text = f"{rate:,.0f} из {self.animation_speed:,} пкс/с"
+        self.rate_label.config(text=text)
+        return text
     
     def stop_animation(self):
+        if self.animation_id:
+            self.cancel_animation()
+            
+            # Замер построения, продолженного анимацией, заканчивается с ней
+            self.editor.draw.finish_profile(paused=True)
+    
+    def cancel_animation(self):
         if self.animation_id:
             self.editor.root.after_cancel(self.animation_id)
             self.animation_id = None
     
     def step_forward(self):
-        if not self.debug_mode or not self.steps:
+        if not self.debug_mode or not self.ensure(0):
             return
-        
-        if self.step_index < len(self.steps) - 1:
+        self.editor.draw.profile(self.next_step, "шаг вперёд", animated=False)
+    
+    def next_step(self):
+        if self.ensure(self.step_index + 1):
             self.step_index += 1
             self.redraw_current()
         else:
@@ -86,32 +269,113 @@ class DebugManager:
     def step_backward(self):
         if not self.debug_mode or not self.steps:
             return
-        
+        self.editor.draw.profile(self.previous_step, "шаг назад", animated=False)
+    
+    def previous_step(self):
         if self.step_index > 0:
             self.step_index -= 1
             self.redraw_current()
         else:
             self.log_message("Достигнуто начало построения")
     
+    def seek(self, index):
+        """Переход к шагу index (с ограничением диапазоном построения)"""
+        if not self.debug_mode or not self.ensure(0):
+            return
+        
+        self.stop_animation()
+        self.editor.draw.profile(lambda: self.show_step(index), "переход к шагу", animated=False)
+    
+    def show_step(self, index):
+        self.ensure(index)
+        self.step_index = min(max(index, 0), len(self.steps) - 1)
+        self.redraw_current()
+    
+    def go_to_step(self):
+        try:
+            index = int(self.seek_entry.get())
+        except ValueError:
+            self.log_message(f"Неверный номер шага: {self.seek_entry.get()}")
+            return
+        self.seek(index)
+    
     def redraw_current(self):
-        self.editor.draw.canvas.delete("curve")
-        for i in range(self.step_index + 1):
-            x, y, intensity = self.steps[i]
-            gray = int(255 * (1 - intensity))
-            color = f"#{gray:02x}{gray:02x}{gray:02x}"
-            self.editor.draw.canvas.create_rectangle(x, y, x+1, y+1, fill=color, outline="", tags="curve")
+        self.ensure(self.step_index)
+        self.render(self.step_index + 1)
         
         if self.step_index < len(self.steps):
-            current = self.steps[self.step_index]
-            self.log_message(f"Шаг {self.step_index}: точка {current[:2]}, интенсивность {current[2]:.2f}")
+            with self.editor.draw.profiler.phase("log"):
+                tracer = self.editor.draw.tracer
+                origin = self.origin(self.step_index)
+                record = tracer.lookup(origin)
+                if record is not None:
+                    self.log_message(tracer.format(record))
+                else:
+                    current = self.steps[self.step_index]
+                    self.log_message(f"Шаг {origin}: точка {current[:2]}, интенсивность {current[2]:.2f}")
     
     def draw_all_steps(self):
-        self.editor.draw.canvas.delete("curve")
-        for x, y, intensity in self.steps:
-            gray = int(255 * (1 - intensity))
-            color = f"#{gray:02x}{gray:02x}{gray:02x}"
-            self.editor.draw.canvas.create_rectangle(x, y, x+1, y+1, fill=color, outline="", tags="curve")
-        self.log_message(f"Построено {len(self.steps)} точек")
+        self.ensure(float('inf'))
+        self.render(len(self.steps))
+        
+        with self.editor.draw.profiler.phase("log"):
+            tracer = self.editor.draw.tracer
+            if tracer.header is not None:
+                self.log_message(tracer.format(tracer.header))
+            if self.compactor is not None and self.compactor.consumed > len(self.steps):
+                self.log_message(f"Построено {len(self.steps)} точек (шагов алгоритма: {self.compactor.consumed})")
+            else:
+                self.log_message(f"Построено {len(self.steps)} точек")
+    
+    def render(self, count):
+        """Выводит первые count шагов, дорисовывая или стирая только разницу"""
+        profiler = self.editor.draw.profiler
+        with profiler.phase("canvas"):
+            renderer = self.get_renderer()
+            drawn, created = renderer.drawn, renderer.created
+            renderer.show(self.steps, count)
+        profiler.count(max(0, renderer.drawn - drawn), renderer.created - created)
+    
+    def update_render(self, renderer, start, stop):
+        """Перерисовка заменённых шагов start..stop-1"""
+        profiler = self.editor.draw.profiler
+        created = renderer.created
+        with profiler.phase("canvas"):
+            renderer.update(self.steps, start, stop)
+        profiler.count(items=renderer.created - created)
+    
+    def get_renderer(self):
+        items = self.items_var is not None and self.items_var.get()
+        kind = ItemRenderer if items else FrameRenderer
+        if not isinstance(self.renderer, kind):
+            if self.renderer is not None:
+                self.renderer.reset()
+            canvas = self.editor.draw.canvas
+            if items:
+                self.renderer = ItemRenderer(canvas)
+            else:
+                self.renderer = FrameRenderer(canvas, self.editor.draw.width, self.editor.draw.height)
+        return self.renderer
+    
+    def reset_render(self):
+        if self.renderer is not None:
+            with self.editor.draw.profiler.phase("canvas"):
+                self.renderer.reset()
+    
+    def rerender(self):
+        """Выводит текущие шаги заново: объекты холста могли быть удалены"""
+        self.reset_render()
+        self.refresh()
+    
+    def refresh(self):
+        if self.debug_mode:
+            self.redraw_current()
+        else:
+            self.draw_all_steps()
+    
+    def toggle_compact(self):
+        """Перестраивает текущий примитив с удалением повторов или без него"""
+        self.editor.draw.redraw()
     
     def update_display(self):
         if self.debug_mode:
@@ -122,18 +386,103 @@ class DebugManager:
     
     def get_speed(self):
         try:
-            speed = int(self.speed_entry.get())
-            return max(0, min(speed, 100))
+            return max(0, int(self.speed_entry.get()))
         except ValueError:
             return 0
     
     def log_message(self, message):
-        self.console.config(state='normal')
-        self.console.insert('end', message + '\n')
-        self.console.config(state='disabled')
-        self.console.see('end')
+        self.sink.write(message)
+    
+    def toggle_log_file(self):
+        if self.sink.streaming:
+            self.sink.stop_streaming()
+            self.log_file_btn.config(text="Лог в файл")
+            self.log_message("Запись лога в файл остановлена")
+            return
+        
+        path = filedialog.asksaveasfilename(defaultextension=".log", filetypes=[("Лог", "*.log"), ("Все файлы", "*.*")])
+        if path:
+            self.log_message(f"Лог пишется в файл {path}")
+            self.sink.stream_to(path)
+            self.log_file_btn.config(text="Остановить запись лога")
+    
+    def toggle_profile(self):
+        profiler = self.editor.draw.profiler
+        profiler.enabled = self.profile_var.get()
+        status = "включено" if profiler.enabled else "выключено"
+        self.log_message(f"Профилирование построений {status}")
+    
+    def toggle_profile_file(self):
+        profiler = self.editor.draw.profiler
+        if profiler.exporting:
+            profiler.stop_export()
+            self.profile_file_btn.config(text="Профиль в файл")
+            self.log_message("Запись профиля в файл остановлена")
+            return
+        
+        path = filedialog.asksaveasfilename(defaultextension=".jsonl", filetypes=[("JSON lines", "*.jsonl"), ("Все файлы", "*.*")])
+        if path:
+            profiler.export_to(path)
+            self.profile_file_btn.config(text="Остановить запись профиля")
+            self.log_message(f"Профиль построений пишется в файл {path}")
+    
+    def record_trace(self):
+        """Записывает все шаги текущего построения в файл трассы"""
+        if not self.ensure(0):
+            self.log_message("Нет построения для записи")
+            return
+        
+        path = filedialog.asksaveasfilename(defaultextension=".trace", filetypes=[("Трасса", "*.trace"), ("Все файлы", "*.*")])
+        if not path:
+            return
+        
+        self.ensure(float('inf'))
+        header = self.editor.draw.tracer.header
+        info = {
+            "kind": header[1] if header is not None else None,
+            "params": list(header[2:]) if header is not None else [],
+            "width": self.editor.draw.width,
+            "height": self.editor.draw.height,
+            "compacted": self.compactor is not None,
+        }
+        try:
+            write_trace(path, info, self.steps)
+        except OSError as e:
+            self.log_message(f"Не удалось записать трассу: {e}")
+            return
+        self.log_message(f"Трасса записана в {path}: {len(self.steps)} шагов, {os.path.getsize(path) / 2**20:.1f} МБ")
+    
+    def open_trace(self):
+        """Воспроизводит шаги из файла трассы.
+        
+        Файл отображается в память, поэтому открытие не зависит от длины
+        трассы, а шаги вперёд, назад и переходы читают только нужные шаги.
+        """
+        path = filedialog.askopenfilename(filetypes=[("Трасса", "*.trace"), ("Все файлы", "*.*")])
+        if not path:
+            return
+        
+        try:
+            info, steps = read_trace(path)
+        except (OSError, ValueError) as e:
+            self.log_message(f"Не удалось открыть трассу: {e}")
+            return
+        
+        # Записанное построение заменяет текущее: опорные точки убираются,
+        # а заголовок трассировки восстанавливается для сообщений
+        self.stop_animation()
+        draw = self.editor.draw
+        draw.clear_points()
+        if info["kind"] is not None:
+            params = [tuple(p) if isinstance(p, list) else p for p in info["params"]]
+            draw.tracer.begin(info["kind"], *params)
+        self.log_message(f"Открыта трасса {path}: {len(steps)} шагов")
+        draw.profile(lambda: self.set_steps(steps), "трасса")
     
     def reset(self):
         self.stop_animation()
-        self.steps = []
-        self.step_index = 0
\ No newline at end of file
+        self.steps = StepBuffer()
+        self.stream = None
+        self.compactor = None
+        self.step_index = 0
+        self.reset_render()
\ No newline at end of file
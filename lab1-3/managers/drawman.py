@@ -1,26 +1,61 @@
 import tkinter as tk
 from tkinter import messagebox
 
+import numpy as np
+
 from algorithms.line import LineAlgorithms
 from algorithms.curve import CurveAlgorithms
 from algorithms.parametric import ParametricAlgorithms
+from algorithms.trace import Tracer, SUMMARY
+from algorithms.stepbuffer import StepBuffer
+from managers.pointgrid import PointGrid
+from managers.resultcache import ResultCache
+from managers.profiler import DrawProfiler
+
+# Перерисовок в секунду при перетаскивании точки: события движения между
+# кадрами объединяются, применяется только последнее положение
+DRAG_FPS = 60
 
 class DrawManager:
     def __init__(self, editor):
         self.editor = editor
         self.canvas = None
+        self.width = 800
+        self.height = 600
         self.points = []
         self.point_markers = []
         self.selected_point = None
         self.dragging = False
         
+        # Сетка опорных точек для проверки попадания курсора
+        self.grid = PointGrid()
+        
+        # Отложенное положение перетаскиваемой точки и таймер кадра
+        self.drag_pos = None
+        self.drag_id = None
+        self.drag_merged = 0
+        self.merged_events = 0
+        
+        # Буфер шагов B-сплайна, собранный из сегментов, и ключи его сегментов
+        self.spline_steps = None
+        self.spline_keys = []
+        
+        # Трассировка шагов алгоритмов (уровень меняет режим отладки)
+        self.tracer = Tracer(SUMMARY)
+        
+        # Результаты построений по алгоритму и целым параметрам
+        self.cache = ResultCache()
+        
+        # Замер времени построений по фазам
+        self.profiler = DrawProfiler()
+        
         # Инициализация алгоритмов
-        self.line_algo = LineAlgorithms(self.log)
-        self.curve_algo = CurveAlgorithms(self.log)
-        self.parametric_algo = ParametricAlgorithms(self.log)
+        self.line_algo = LineAlgorithms(self.tracer)
+        self.curve_algo = CurveAlgorithms(self.tracer)
+        self.parametric_algo = ParametricAlgorithms(self.tracer)
     
     def setup_canvas(self):
-        self.canvas = tk.Canvas(self.editor.root, width=800, height=600, bg="white")
+        self.canvas = tk.Canvas(self.editor.root, width=self.width, height=self.height, bg="white")
         self.canvas.grid(row=1, column=0, columnspan=6, sticky="nsew")
         
         # Привязка событий
@@ -31,13 +66,14 @@ class DrawManager:
     def on_canvas_click(self, event):
         if self.dragging:
             return
-            
+        
         # Проверка клика по существующей точке
-        for i, (marker, (x, y)) in enumerate(zip(self.point_markers, self.points)):
-            if abs(x - event.x) <= 5 and abs(y - event.y) <= 5:
-                self.selected_point = i
-                self.dragging = True
-                return
+        index = self.grid.hit(event.x, event.y, 5)
+        if index is not None:
+            self.selected_point = index
+            self.dragging = True
+            self.drag_merged = 0
+            return
         
         # Добавление новой точки
         if not self.editor.current_tool or not self.editor.current_algorithm:
@@ -49,52 +85,121 @@ class DrawManager:
     
     def on_canvas_drag(self, event):
         if self.selected_point is not None and self.dragging:
-            index = self.selected_point
-            old_x, old_y = self.points[index]
-            dx = event.x - old_x
-            dy = event.y - old_y
+            # Положение, не успевшее попасть в кадр, заменяется новым
+            if self.drag_pos is not None:
+                self.drag_merged += 1
+                self.merged_events += 1
+            self.drag_pos = (event.x, event.y)
             
-            self.canvas.move(self.point_markers[index], dx, dy)
-            self.points[index] = (event.x, event.y)
+            # Первое событие применяется сразу, следующие - по таймеру кадра
+            if self.drag_id is None:
+                self.apply_drag()
+    
+    def apply_drag(self):
+        """Перемещает точку в последнее положение и перерисовывает кривую"""
+        self.drag_id = None
+        if self.drag_pos is None or self.selected_point is None:
+            return
+        
+        index = self.selected_point
+        old_x, old_y = self.points[index]
+        x, y = self.drag_pos
+        self.drag_pos = None
+        
+        self.canvas.move(self.point_markers[index], x - old_x, y - old_y)
+        self.points[index] = (x, y)
+        self.grid.move(index, x, y)
+        if not self.profile(self.update_bspline):
             self.redraw()
+        
+        self.drag_id = self.editor.root.after(int(1000 / DRAG_FPS), self.apply_drag)
     
     def on_canvas_release(self, event):
         if self.selected_point is not None:
-            self.log(f"Точка {self.selected_point} перемещена в ({event.x}, {event.y})")
+            # Отложенное положение применяется до завершения перетаскивания
+            if self.drag_id is not None:
+                self.editor.root.after_cancel(self.drag_id)
+                self.apply_drag()
+                if self.drag_id is not None:
+                    self.editor.root.after_cancel(self.drag_id)
+                    self.drag_id = None
+            
+            self.log(f"Точка {self.selected_point} перемещена в ({event.x}, {event.y}), "
+                     f"объединено событий движения: {self.drag_merged}")
             self.selected_point = None
             self.dragging = False
     
     def add_point(self, x, y):
+        self.grid.insert(len(self.points), x, y)
         self.points.append((x, y))
         marker = self.canvas.create_oval(x-3, y-3, x+3, y+3, fill="gray", tags="point")
         self.point_markers.append(marker)
         self.log(f"Добавлена точка: ({x}, {y})")
     
+    def nearest_point(self, x, y, limit=None):
+        """Номер ближайшей к (x, y) опорной точки или None"""
+        return self.grid.nearest(x, y, limit)
+    
     def try_draw(self):
+        draw = self.primitive()
+        if draw is not None:
+            self.profile(draw)
+    
+    def primitive(self):
+        """Метод построения примитива по текущим точкам или None, если строить нечего"""
         tool = self.editor.current_tool
         algo = self.editor.current_algorithm
         
         if tool == "line" and len(self.points) == 2:
-            self.draw_line()
+            return self.draw_line
         elif tool == "curve" and len(self.points) == 2:
-            self.draw_curve()
+            return self.draw_curve
         elif tool == "parametric":
             if (algo in ["Эрмит", "Безье"] and len(self.points) == 4) or \
                (algo == "B-сплайн" and len(self.points) >= 4):
-                self.draw_parametric()
+                return self.draw_parametric
+        return None
+    
+    def profile(self, draw, name=None, animated=True):
+        """Выполняет построение draw с замером фаз, если профилирование включено.
+        
+        Сводка выводится в консоль; результат False означает, что построения
+        не было, и замер отбрасывается. Если построение продолжает анимация
+        отладки (animated), замер идёт по её кадрам до конца анимации.
+        """
+        if animated:
+            # Новое построение заканчивает замер анимации прежнего
+            self.finish_profile(paused=True)
+        self.profiler.begin(name or self.editor.current_algorithm)
+        result = draw()
+        if result is False:
+            self.profiler.cancel()
+        elif animated and self.editor.debug.animation_id is not None:
+            self.profiler.pause()
+        else:
+            self.finish_profile()
+        return result
+    
+    def finish_profile(self, paused=False):
+        """Закрывает замер построения и выводит его сводку"""
+        summary = self.profiler.finish(paused)
+        if summary is not None:
+            self.log(summary)
     
     def draw_line(self):
         x1, y1 = self.points[0]
         x2, y2 = self.points[1]
         
+        # Отрезок отсекается по холсту: шаги за его пределами не считаются
+        key = (self.editor.current_algorithm, x1, y1, x2, y2, self.width, self.height)
         if self.editor.current_algorithm == "ЦДА":
-            steps = [(x, y, 1) for x, y in self.line_algo.dda(x1, y1, x2, y2)]
+            steps = self.line_algo.dda_iter(x1, y1, x2, y2, self.width, self.height)
         elif self.editor.current_algorithm == "Брезенхем":
-            steps = [(x, y, 1) for x, y in self.line_algo.bresenham(x1, y1, x2, y2)]
+            steps = self.line_algo.bresenham_iter(x1, y1, x2, y2, self.width, self.height)
         elif self.editor.current_algorithm == "Ву":
-            steps = self.line_algo.wu(x1, y1, x2, y2)
+            steps = self.line_algo.wu_iter(x1, y1, x2, y2, self.width, self.height)
         
-        self.editor.debug.set_steps(steps)
+        self.set_steps(key, steps)
     
     def draw_curve(self):
         x1, y1 = self.points[0]
@@ -102,33 +207,122 @@ class DrawManager:
         
         if self.editor.current_algorithm == "Окружность":
             r = int(((x2 - x1)**2 + (y2 - y1)**2)**0.5)
-            steps = [(x, y, 1) for x, y in self.curve_algo.circle(x1, y1, r)]
+            key = ("Окружность", x1, y1, r)
+            steps = self.curve_algo.circle_iter(x1, y1, r)
         elif self.editor.current_algorithm == "Эллипс":
             a = abs(x2 - x1)
             b = abs(y2 - y1)
-            steps = [(x, y, 1) for x, y in self.curve_algo.ellipse(x1, y1, a, b)]
+            key = ("Эллипс", x1, y1, a, b)
+            steps = self.curve_algo.ellipse_iter(x1, y1, a, b)
         elif self.editor.current_algorithm == "Гипербола":
             a = abs(x2 - x1)
             b = abs(y2 - y1)
-            steps = [(x, y, 1) for x, y in self.curve_algo.hyperbola(x1, y1, a, b)]
+            key = ("Гипербола", x1, y1, a, b, self.width, self.height)
+            steps = self.curve_algo.hyperbola_iter(x1, y1, a, b, self.width, self.height)
         elif self.editor.current_algorithm == "Парабола":
             p = abs(x2 - x1)
-            steps = [(x, y, 1) for x, y in self.curve_algo.parabola(x1, y1, p)]
+            key = ("Парабола", x1, y1, p, self.width, self.height)
+            steps = self.curve_algo.parabola_iter(x1, y1, p, self.width, self.height)
         
-        self.editor.debug.set_steps(steps if steps else [])
+        self.set_steps(key, steps)
     
     def draw_parametric(self):
         if self.editor.current_algorithm == "Эрмит":
             p1, p4, r1, r4 = self.points
-            steps = [(x, y, 1) for x, y in self.parametric_algo.hermite(p1, p4, (r1[0]-p1[0], r1[1]-p1[1]), (r4[0]-p4[0], r4[1]-p4[1]))]
+            steps = self.parametric_algo.hermite_iter(p1, p4, (r1[0]-p1[0], r1[1]-p1[1]), (r4[0]-p4[0], r4[1]-p4[1]))
         elif self.editor.current_algorithm == "Безье":
-            steps = [(x, y, 1) for x, y in self.parametric_algo.bezier(*self.points)]
+            steps = self.parametric_algo.bezier_iter(*self.points)
         elif self.editor.current_algorithm == "B-сплайн":
-            steps = [(x, y, 1) for x, y in self.parametric_algo.bspline(self.points)]
+            steps = self.parametric_algo.bspline_iter(self.points)
+        
+        self.set_steps((self.editor.current_algorithm,) + tuple(self.points), steps)
+    
+    def set_steps(self, key, steps):
+        """Передаёт шаги отладчику через кэш результатов.
+        
+        Поток точек алгоритма читается пакетами массивов, без промежуточных
+        кортежей шагов. Повторное построение с теми же параметрами берётся
+        из кэша, новое запоминается по мере чтения потока. В режиме отладки
+        кэш не используется: нужны записи трассировки каждого шага.
+        """
+        steps = self.profiler.array_chunks(steps)
+        if self.tracer.steps:
+            self.editor.debug.set_steps(steps)
+            return
+        
+        entry = self.cache.get(key)
+        if entry is not None:
+            # Заголовок построения восстанавливается без запуска алгоритма
+            header = entry[3]
+            if header is not None:
+                self.tracer.begin(*header[1:])
+            steps = self.cache.replay(entry)
+        else:
+            steps = self.cache.record(key, steps, lambda: self.tracer.header)
         
         self.editor.debug.set_steps(steps)
+        with self.profiler.phase("log"):
+            result = "попадание" if entry is not None else "промах"
+            self.log(f"Кэш результатов: {result} ({self.cache.summary()})")
+    
+    def update_bspline(self):
+        """Обновление B-сплайна после перемещения точки.
+        
+        Пересчитываются и заменяются в буфере шагов только сегменты, опорные
+        точки которых изменились. Возвращает False, если нужна полная
+        перерисовка (другой инструмент или режим отладки с трассировкой шагов).
+        При удалении повторов пикселей сплайн выводится заново целиком.
+        """
+        debug = self.editor.debug
+        if self.editor.current_tool != "parametric" or self.editor.current_algorithm != "B-сплайн":
+            return False
+        if debug.debug_mode or len(self.points) < 4:
+            return False
+        
+        with self.profiler.phase("algorithm"):
+            segments, keys = self.parametric_algo.bspline_segments(self.points)
+        
+        # Повторы пикселей удаляются по всему сплайну, поэтому сегменты нельзя
+        # заменить по отдельности: сплайн собирается из сегментов и целиком
+        # проходит через удаление повторов, как при полной перерисовке
+        if debug.compacting():
+            with self.profiler.phase("conversion"):
+                xs, ys = self.join(segments)
+            self.spline_steps = None
+            self.spline_keys = keys
+            debug.set_steps(iter([(xs.astype(np.int64), ys.astype(np.int64), np.ones(len(xs)))]))
+            return True
+        
+        # Буфер мог быть заменён другим построением - тогда собираем его заново
+        if debug.steps is not self.spline_steps or debug.stream is not None or len(keys) != len(self.spline_keys):
+            with self.profiler.phase("conversion"):
+                self.spline_steps = StepBuffer.from_arrays(*self.join(segments))
+            self.spline_keys = keys
+            debug.set_steps(self.spline_steps)
+            return True
+        
+        changed = [i for i, (old, new) in enumerate(zip(self.spline_keys, keys)) if old != new]
+        if changed:
+            # Все сегменты одного сплайна содержат одинаковое число точек
+            size = len(segments[0][0])
+            start, stop = changed[0], changed[-1] + 1
+            with self.profiler.phase("conversion"):
+                xs, ys = self.join(segments[start:stop])
+            debug.replace_steps(start * size, xs, ys)
+        self.spline_keys = keys
+        return True
+    
+    def join(self, segments):
+        """Массивы координат сегментов -> общие массивы xs, ys"""
+        return np.concatenate([xs for xs, _ in segments]), np.concatenate([ys for _, ys in segments])
     
     def redraw(self):
+        # Без примитива (например, после открытия трассы) перестраивать нечего:
+        # текущие шаги выводятся заново с чистого холста
+        if self.primitive() is None:
+            self.editor.debug.rerender()
+            return
+        
         # Сохраняем текущий режим отладки
         debug_mode = self.editor.debug.debug_mode
         current_step = self.editor.debug.step_index
@@ -142,6 +336,7 @@ class DrawManager:
         # Восстанавливаем состояние отладки
         if debug_mode:
             self.editor.debug.debug_mode = True
+            self.editor.debug.ensure(current_step)
             self.editor.debug.step_index = min(current_step, len(self.editor.debug.steps)-1)
             self.editor.debug.redraw_current()
     
@@ -151,6 +346,8 @@ class DrawManager:
         self.points = []
         self.point_markers = []
         self.selected_point = None
+        self.drag_pos = None
+        self.grid.clear()
     
     def clear_canvas(self):
         self.canvas.delete("all")
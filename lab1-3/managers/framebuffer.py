@@ -0,0 +1,62 @@
+import struct
+import zlib
+
+import numpy as np
+
+class FrameBuffer:
+    """RGBA-буфер кадра для отрисовки шагов без объектов холста"""
+    
+    def __init__(self, width, height, background=(255, 255, 255)):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.pixels = np.empty((height, width, 4), dtype=np.uint8)
+        self.clear()
+    
+    def clear(self):
+        self.pixels[..., :3] = self.background
+        self.pixels[..., 3] = 0
+    
+    def composite(self, xs, ys, intensity, color=(0, 0, 0)):
+        """Накладывает пиксели цвета color с альфой intensity (оператор over).
+        
+        Наложения одного цвета перемножают пропускание (1 - a), поэтому
+        повторы пикселя в пакете объединяются произведением и порядок
+        шагов на результат не влияет.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        alpha = np.clip(np.asarray(intensity, dtype=np.float64), 0, 1)
+        
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        if not inside.all():
+            xs, ys, alpha = xs[inside], ys[inside], alpha[inside]
+        if not len(xs):
+            return
+        
+        cells, inverse = np.unique(ys * self.width + xs, return_inverse=True)
+        keep = np.ones(len(cells))
+        np.multiply.at(keep, inverse, 1 - alpha)
+        
+        flat = self.pixels.reshape(-1, 4)
+        px = flat[cells].astype(np.float64)
+        px[:, :3] = px[:, :3] * keep[:, None] + np.asarray(color) * (1 - keep)[:, None]
+        px[:, 3] = 255 - (255 - px[:, 3]) * keep
+        flat[cells] = np.rint(px).astype(np.uint8)
+    
+    def to_ppm(self):
+        """Кадр в формате PPM (P6) для PhotoImage и записи в файл"""
+        header = f"P6 {self.width} {self.height} 255\n".encode()
+        return header + self.pixels[..., :3].tobytes()
+    
+    def to_png(self):
+        """Кадр в формате PNG (RGB, 8 бит) без сторонних библиотек"""
+        def chunk(tag, data):
+            return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+        
+        # Каждая строка начинается с байта фильтра 0
+        raw = np.zeros((self.height, 1 + self.width * 3), dtype=np.uint8)
+        raw[:, 1:] = self.pixels[..., :3].reshape(self.height, -1)
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+                + chunk(b"IDAT", zlib.compress(raw.tobytes())) + chunk(b"IEND", b""))
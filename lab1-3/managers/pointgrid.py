@@ -0,0 +1,120 @@
+import math
+
+# Размер ячейки сетки в пикселях: окно попадания 11x11 задевает не больше
+# четырёх ячеек
+CELL_SIZE = 16
+
+
+class PointGrid:
+    """Равномерная сетка опорных точек для поиска точки под курсором.
+    
+    Точка хранится в ячейке (x // cell, y // cell), поэтому проверка
+    попадания смотрит только соседние ячейки, а не все точки.
+    """
+    
+    def __init__(self, cell=CELL_SIZE):
+        self.cell = cell
+        self.cells = {}
+        self.positions = {}
+        self.bounds = None
+    
+    def key(self, x, y):
+        return (int(x // self.cell), int(y // self.cell))
+    
+    def insert(self, index, x, y):
+        self.positions[index] = (x, y)
+        key = self.key(x, y)
+        self.cells.setdefault(key, []).append(index)
+        
+        # Границы занятых ячеек только расширяются - это оценка сверху
+        if self.bounds is None:
+            self.bounds = key + key
+        else:
+            x0, y0, x1, y1 = self.bounds
+            self.bounds = (min(x0, key[0]), min(y0, key[1]), max(x1, key[0]), max(y1, key[1]))
+    
+    def remove(self, index):
+        x, y = self.positions.pop(index)
+        key = self.key(x, y)
+        bucket = self.cells[key]
+        bucket.remove(index)
+        if not bucket:
+            del self.cells[key]
+    
+    def move(self, index, x, y):
+        old = self.positions[index]
+        if self.key(*old) == self.key(x, y):
+            self.positions[index] = (x, y)
+            return
+        self.remove(index)
+        self.insert(index, x, y)
+    
+    def clear(self):
+        self.cells = {}
+        self.positions = {}
+        self.bounds = None
+    
+    def hit(self, x, y, tolerance=5):
+        """Номер точки не дальше tolerance по каждой оси или None.
+        
+        Если подходят несколько точек, возвращается меньший номер, как
+        при переборе списка точек по порядку.
+        """
+        x0, y0 = self.key(x - tolerance, y - tolerance)
+        x1, y1 = self.key(x + tolerance, y + tolerance)
+        found = None
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for index in self.cells.get((cx, cy), ()):
+                    px, py = self.positions[index]
+                    if abs(px - x) <= tolerance and abs(py - y) <= tolerance:
+                        if found is None or index < found:
+                            found = index
+        return found
+    
+    def nearest(self, x, y, limit=None):
+        """Номер ближайшей точки или None (если задан limit - не дальше него).
+        
+        Ячейки просматриваются кольцами вокруг ячейки курсора; поиск
+        останавливается, когда следующее кольцо заведомо дальше найденной точки.
+        """
+        if not self.positions:
+            return None
+        
+        kx, ky = self.key(x, y)
+        x0, y0, x1, y1 = self.bounds
+        reach = max(kx - x0, x1 - kx, ky - y0, y1 - ky, 0)
+        if limit is not None:
+            reach = min(reach, int(limit // self.cell) + 1)
+        
+        # Когда колец больше, чем точек, быстрее перебрать точки
+        if (2 * reach + 1)**2 > len(self.positions):
+            candidates = [self.positions.keys()]
+        else:
+            candidates = self.rings(kx, ky, reach)
+        
+        best, best_dist = None, math.inf
+        for r, indices in enumerate(candidates):
+            # Точки кольца r не ближе (r - 1) * cell к курсору
+            if best is not None and best_dist < (r - 1) * self.cell:
+                break
+            for index in indices:
+                px, py = self.positions[index]
+                dist = math.hypot(px - x, py - y)
+                if dist < best_dist or (dist == best_dist and index < best):
+                    best, best_dist = index, dist
+        
+        if limit is not None and best_dist > limit:
+            return None
+        return best
+    
+    def rings(self, kx, ky, reach):
+        """Номера точек колец ячеек на расстоянии 0..reach (по Чебышёву)
+        от ячейки (kx, ky), по кольцу за раз"""
+        for r in range(reach + 1):
+            if r == 0:
+                keys = [(kx, ky)]
+            else:
+                keys = [(cx, cy) for cx in range(kx - r, kx + r + 1) for cy in (ky - r, ky + r)]
+                keys += [(cx, cy) for cy in range(ky - r + 1, ky + r) for cx in (kx - r, kx + r)]
+            yield [index for key in keys for index in self.cells.get(key, ())]
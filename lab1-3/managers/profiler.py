@@ -0,0 +1,159 @@
+import json
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from algorithms.stepbuffer import CHUNK_SIZE, array_chunks, to_arrays
+
+# Фазы построения: шаги алгоритма, форматирование сообщений лога,
+# преобразование точек в массивы и буфер шагов, вывод на холст
+PHASES = ("algorithm", "log", "conversion", "canvas")
+
+PHASE_NAMES = {
+    "algorithm": "алгоритм",
+    "log": "лог",
+    "conversion": "преобразование",
+    "canvas": "холст",
+    "other": "прочее",
+}
+
+
+class DrawProfiler:
+    """Замер времени построения по фазам.
+    
+    Построение открывается begin и закрывается finish; время внутри
+    фаз копится в записи построения, вложенная фаза приостанавливает
+    внешнюю. Вне построения и при выключенном профилировании фазы
+    ничего не замеряют. Записи построений можно писать в файл JSON lines.
+    
+    Построение в режиме отладки продолжается кадрами анимации: его замер
+    откладывается (pause) между кадрами и продолжается (resume) в каждом
+    кадре, так что время ожидания следующего кадра не учитывается.
+    """
+    
+    def __init__(self):
+        self.enabled = False
+        self.record = None
+        self.paused = None
+        self.draws = 0
+        self.started = 0
+        self.mark = 0
+        self.stack = []
+        self.file = None
+    
+    def begin(self, name):
+        """Начало замера построения name; отложенный замер не затрагивается"""
+        self.record = None
+        self.stack = []
+        if not self.enabled:
+            return
+        self.draws += 1
+        self.record = {"draw": self.draws, "name": name, "time": time.time(), "total": 0.0, "frames": 1,
+                       "phases": dict.fromkeys(PHASES, 0.0), "points": 0, "items": 0}
+        self.started = time.perf_counter()
+    
+    def pause(self):
+        """Откладывает текущий замер до следующего кадра анимации"""
+        if self.record is None:
+            return
+        self.record["total"] += time.perf_counter() - self.started
+        self.paused, self.record = self.record, None
+        self.stack = []
+    
+    def resume(self):
+        """Продолжает отложенный замер очередным кадром"""
+        if self.paused is None or self.record is not None:
+            return
+        self.record, self.paused = self.paused, None
+        self.record["frames"] += 1
+        self.started = time.perf_counter()
+    
+    @contextmanager
+    def phase(self, name):
+        """Замер фазы name внутри текущего построения"""
+        if self.record is None:
+            yield
+            return
+        
+        now = time.perf_counter()
+        phases = self.record["phases"]
+        if self.stack:
+            phases[self.stack[-1]] += now - self.mark
+        self.stack.append(name)
+        self.mark = now
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            if self.record is not None and self.stack:
+                phases[self.stack.pop()] += now - self.mark
+            self.mark = now
+    
+    def count(self, points=0, items=0):
+        """Учёт выведенных точек и созданных объектов холста"""
+        if self.record is not None:
+            self.record["points"] += points
+            self.record["items"] += items
+    
+    def array_chunks(self, points, size=CHUNK_SIZE):
+        """Поток пакетов массивов, как array_chunks, с разделением времени
+        на шаги алгоритма и преобразование точек"""
+        if self.record is None:
+            return array_chunks(points, size)
+        return self.timed_chunks(iter(points), size)
+    
+    def timed_chunks(self, points, size):
+        while True:
+            with self.phase("algorithm"):
+                chunk = list(islice(points, size))
+            if not chunk:
+                return
+            with self.phase("conversion"):
+                arrays = to_arrays(chunk)
+            yield arrays
+    
+    def finish(self, paused=False):
+        """Закрывает текущий замер (paused=True - отложенный); возвращает
+        строку сводки или None"""
+        if paused:
+            record, self.paused = self.paused, None
+        else:
+            record = self.record
+            if record is not None:
+                record["total"] += time.perf_counter() - self.started
+            self.record = None
+            self.stack = []
+        if record is None:
+            return None
+        
+        record["phases"]["other"] = max(0.0, record["total"] - sum(record["phases"].values()))
+        if self.file is not None:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+        return self.summary(record)
+    
+    def cancel(self):
+        """Отбрасывает начатый замер"""
+        self.record = None
+        self.stack = []
+    
+    def summary(self, record):
+        phases = ", ".join(f"{PHASE_NAMES[name]} {seconds * 1000:.1f}"
+                           for name, seconds in record["phases"].items())
+        frames = f", кадров {record['frames']}" if record["frames"] > 1 else ""
+        return (f"Профиль {record['name']}: {record['total'] * 1000:.1f} мс ({phases}), "
+                f"точек {record['points']}, объектов холста {record['items']}{frames}")
+    
+    @property
+    def exporting(self):
+        return self.file is not None
+    
+    def export_to(self, path):
+        """Записи следующих построений пишутся в файл JSON lines"""
+        self.stop_export()
+        self.file = open(path, "a", encoding="utf-8")
+    
+    def stop_export(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,236 @@
+import bisect
+import tkinter as tk
+
+import numpy as np
+
+from managers.framebuffer import FrameBuffer
+
+# Период контрольных точек буфера кадра и их максимальное число:
+# при переполнении период удваивается, а лишние точки отбрасываются
+CHECKPOINT_INTERVAL = 1024
+MAX_CHECKPOINTS = 32
+
+# Сколько последних шагов перед целью перехода попадает в журнал отмены:
+# при переходе далеко вперёд более ранние шаги не журналируются, и журнал
+# не растёт с длиной трассы
+UNDO_WINDOW = 1 << 20
+
+
+def gray(intensity):
+    """Цвет пикселя с заданной интенсивностью на белом фоне"""
+    value = int(255 * (1 - intensity))
+    return f"#{value:02x}{value:02x}{value:02x}"
+
+
+class ItemRenderer:
+    """Прямоугольники холста по шагам.
+    
+    Шаги подряд по одной строке с одинаковой интенсивностью объединяются
+    в горизонтальный отрезок - один прямоугольник. Отрезок хранится как
+    [id, первый x, последний x, y, интенсивность, число шагов, направление,
+    номер первого шага].
+    """
+    
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.items = []
+        self.drawn = 0
+        
+        # Сколько объектов холста создано за всё время (для профилирования)
+        self.created = 0
+    
+    def reset(self):
+        self.canvas.delete("curve")
+        self.items = []
+        self.drawn = 0
+    
+    def show(self, steps, count):
+        """Приводит холст к первым count шагам, рисуя только разницу"""
+        if count > self.drawn:
+            self.extend(self.items, steps, self.drawn, count)
+            self.drawn = count
+        
+        span = None
+        while self.drawn > count:
+            span = self.items[-1]
+            span[5] -= 1
+            self.drawn -= 1
+            if span[5] == 0:
+                self.canvas.delete(span[0])
+                self.items.pop()
+                span = None
+            else:
+                span[2] -= span[6]
+                if span[5] == 1:
+                    span[6] = 0
+        if span is not None:
+            self.resize(span)
+    
+    def update(self, steps, start, stop):
+        """Перерисовка после замены шагов start..stop-1: пересоздаются только
+        отрезки, в которые попали эти шаги"""
+        stop = min(stop, self.drawn)
+        if start >= stop:
+            return
+        firsts = [span[7] for span in self.items]
+        i = bisect.bisect_right(firsts, start) - 1
+        j = bisect.bisect_left(firsts, stop)
+        begin = firsts[i]
+        end = firsts[j] if j < len(firsts) else self.drawn
+        
+        for span in self.items[i:j]:
+            self.canvas.delete(span[0])
+        spans = []
+        self.extend(spans, steps, begin, end)
+        self.items[i:j] = spans
+    
+    def extend(self, items, steps, start, end):
+        """Добавляет в items отрезки шагов start..end-1, продолжая последний"""
+        changed = {}
+        xs, ys, values = steps.arrays(start, end)
+        for index, x, y, intensity in zip(range(start, end), xs.tolist(), ys.tolist(), values.tolist()):
+            span = items[-1] if items else None
+            if span is not None and span[3] == y and span[4] == intensity and self.extends(span, x):
+                # Направление отрезка задаёт его второй шаг
+                span[6] = x - span[2]
+                span[2] = x
+                span[5] += 1
+                changed[id(span)] = span
+            else:
+                item = self.canvas.create_rectangle(x, y, x+1, y+1, fill=gray(intensity), outline="", tags="curve")
+                items.append([item, x, x, y, intensity, 1, 0, index])
+                self.created += 1
+        
+        # Размеры продлённых отрезков обновляются один раз за вызов
+        for span in changed.values():
+            self.resize(span)
+    
+    def extends(self, span, x):
+        """Продолжает ли пиксель в столбце x отрезок span"""
+        direction = span[6]
+        if direction == 0:
+            return abs(x - span[2]) == 1
+        return x - span[2] == direction
+    
+    def resize(self, span):
+        item, x0, x1, y = span[:4]
+        self.canvas.coords(item, min(x0, x1), y, max(x0, x1) + 1, y + 1)
+
+
+class FrameRenderer:
+    """Инкрементальный вывод шагов через буфер кадра.
+    
+    Для каждого шага запоминается прежнее значение ячейки, поэтому шаг
+    назад восстанавливает один пиксель. Переход к произвольному шагу
+    начинается с ближайшей контрольной копии буфера.
+    """
+    
+    def __init__(self, canvas, width, height):
+        self.canvas = canvas
+        self.framebuffer = FrameBuffer(width, height)
+        self.photo = None
+        self.created = 0
+        self.reset()
+    
+    def reset(self):
+        self.canvas.delete("curve")
+        self.framebuffer.clear()
+        self.drawn = 0
+        self.interval = CHECKPOINT_INTERVAL
+        self.checkpoints = {0: self.framebuffer.pixels.copy()}
+        
+        # Журнал отмены действителен для шагов undo_from..drawn-1 и хранит
+        # их с нулевого элемента
+        self.undo_cells = np.empty(0, dtype=np.int64)
+        self.undo_pixels = np.empty((0, 4), dtype=np.uint8)
+        self.undo_from = 0
+    
+    def show(self, steps, count):
+        if count > self.drawn:
+            self.advance(steps, count)
+        elif count < self.drawn:
+            self.retreat(steps, count)
+        self.blit()
+    
+    def update(self, steps, start, stop):
+        """Перерисовка после замены шагов start..stop-1: буфер откатывается
+        к шагу start и снова доводится до прежнего числа шагов"""
+        if start < self.drawn:
+            count = self.drawn
+            self.retreat(steps, start)
+            self.advance(steps, count)
+            self.blit()
+    
+    def advance(self, steps, count):
+        while self.drawn < count:
+            boundary = (self.drawn // self.interval + 1) * self.interval
+            end = min(count, boundary)
+            if self.drawn < count - UNDO_WINDOW < end:
+                end = count - UNDO_WINDOW
+            self.apply(steps, self.drawn, end, journal=self.drawn >= count - UNDO_WINDOW)
+            self.drawn = end
+            if end == boundary:
+                self.save_checkpoint()
+    
+    def apply(self, steps, start, end, journal=True):
+        fb = self.framebuffer
+        xs, ys, intensity = steps.arrays(start, end)
+        xs, ys = xs.astype(np.int64), ys.astype(np.int64)
+        inside = (xs >= 0) & (xs < fb.width) & (ys >= 0) & (ys < fb.height)
+        cells = np.where(inside, ys * fb.width + xs, -1)
+        
+        # Прежние значения ячеек точны, только если пакет не рисует ячейку дважды
+        visible = cells[inside]
+        if journal and self.undo_from == start and len(np.unique(visible)) == len(visible):
+            self.grow_undo(end - self.undo_from)
+            begin = start - self.undo_from
+            self.undo_cells[begin:begin + len(cells)] = cells
+            self.undo_pixels[begin:begin + len(cells)][inside] = fb.pixels.reshape(-1, 4)[visible]
+        else:
+            self.undo_from = end
+        
+        fb.composite(xs, ys, intensity)
+    
+    def retreat(self, steps, count):
+        if count >= self.undo_from:
+            cells = self.undo_cells[count - self.undo_from:self.drawn - self.undo_from]
+            pixels = self.undo_pixels[count - self.undo_from:self.drawn - self.undo_from]
+            valid = cells >= 0
+            
+            # Для ячейки, задетой несколько раз, верно значение до первого шага
+            cells, first = np.unique(cells[valid], return_index=True)
+            self.framebuffer.pixels.reshape(-1, 4)[cells] = pixels[valid][first]
+            self.drawn = count
+        else:
+            start = max(k for k in self.checkpoints if k <= count)
+            self.framebuffer.pixels[...] = self.checkpoints[start]
+            self.drawn = start
+            self.undo_from = start
+            self.advance(steps, count)
+    
+    def grow_undo(self, size):
+        if size > len(self.undo_cells):
+            capacity = max(size, 2 * len(self.undo_cells))
+            cells = np.empty(capacity, dtype=np.int64)
+            pixels = np.empty((capacity, 4), dtype=np.uint8)
+            cells[:len(self.undo_cells)] = self.undo_cells
+            pixels[:len(self.undo_pixels)] = self.undo_pixels
+            self.undo_cells, self.undo_pixels = cells, pixels
+    
+    def save_checkpoint(self):
+        self.checkpoints[self.drawn] = self.framebuffer.pixels.copy()
+        if len(self.checkpoints) > MAX_CHECKPOINTS:
+            self.interval *= 2
+            self.checkpoints = {k: v for k, v in self.checkpoints.items() if k % self.interval == 0}
+    
+    def blit(self):
+        """Один вывод буфера кадра на холст"""
+        data = self.framebuffer.to_ppm()
+        if self.photo is None:
+            self.photo = tk.PhotoImage(data=data, format="PPM")
+        else:
+            self.photo.configure(data=data, format="PPM")
+        self.canvas.delete("curve")
+        self.canvas.create_image(0, 0, anchor="nw", image=self.photo, tags="curve")
+        self.created += 1
+        self.canvas.tag_raise("point")
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Ограничения кэша по умолчанию: суммарный объём массивов и число записей
+MAX_BYTES = 64 * 1024 * 1024
+MAX_ENTRIES = 256
+
+
+class ResultCache:
+    """LRU-кэш построенных примитивов.
+    
+    Запись - массивы координат int32 и интенсивностей (None, если все
+    пиксели сплошные) плюс произвольные данные построения. При нехватке
+    места вытесняются давно не использованные записи.
+    """
+    
+    def __init__(self, max_bytes=MAX_BYTES, max_entries=MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def replay(self, entry):
+        """Поток из одного пакета (xs, ys, intensity) с шагами записи кэша"""
+        xs, ys, intensity, _ = entry
+        return iter([(xs, ys, np.ones(len(xs)) if intensity is None else intensity)])
+    
+    def record(self, key, chunks, info=None):
+        """Пропускает поток пакетов (xs, ys, intensity), запоминая его.
+        
+        В кэш попадает только поток, дочитанный до конца; info вызывается
+        в этот момент, и её результат хранится вместе с записью.
+        """
+        seen = []
+        for chunk in chunks:
+            seen.append(chunk)
+            yield chunk
+        
+        xs, ys, intensity = (np.concatenate(part) for part in zip(*seen)) if seen else (np.empty(0),) * 3
+        self.put(key, (
+            xs.astype(np.int32),
+            ys.astype(np.int32),
+            None if np.all(intensity == 1) else intensity.astype(np.float32),
+            info() if info is not None else None,
+        ))
+    
+    def put(self, key, entry):
+        size = self.size(entry)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= self.size(self.entries.pop(key))
+        
+        while self.entries and (self.bytes + size > self.max_bytes or len(self.entries) >= self.max_entries):
+            _, old = self.entries.popitem(last=False)
+            self.bytes -= self.size(old)
+            self.evictions += 1
+        
+        self.entries[key] = entry
+        self.bytes += size
+    
+    def size(self, entry):
+        xs, ys, intensity, _ = entry
+        return xs.nbytes + ys.nbytes + (intensity.nbytes if intensity is not None else 0)
+    
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+    
+    def summary(self):
+        return (f"попаданий {self.hits}, промахов {self.misses}, вытеснено {self.evictions}, "
+                f"записей {len(self.entries)}, {self.bytes / 1024:.0f} из {self.max_bytes / 1024:.0f} КБ")
@@ -0,0 +1,78 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from algorithms.stepbuffer import StepBuffer
+from algorithms.trace import NAMES
+
+# Файл трассы: сигнатура, длина заголовка (uint32), заголовок JSON в UTF-8,
+# затем записи шагов по 12 байт (x, y, интенсивность), всё little-endian
+MAGIC = b"GIISTRC1"
+RECORD = np.dtype([("x", "<i4"), ("y", "<i4"), ("intensity", "<f4")])
+
+# Обязательные поля заголовка
+HEADER_KEYS = ("kind", "params", "steps")
+
+# Сколько шагов записывать за раз
+WRITE_CHUNK = 1 << 20
+
+
+def write_trace(path, header, steps):
+    """Записывает шаги StepBuffer в файл трассы.
+    
+    header - словарь с описанием построения; число шагов в него добавляется.
+    Файл пишется рядом под временным именем и затем подменяет path: если
+    шаги отображены из того же файла, отображение остаётся на старом файле,
+    а не обрезается во время записи.
+    """
+    header = dict(header, steps=len(steps))
+    data = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    temp = path + ".tmp"
+    try:
+        with open(temp, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(data)) + data)
+            for start in range(0, len(steps), WRITE_CHUNK):
+                steps.data[start:min(start + WRITE_CHUNK, len(steps))].astype(RECORD).tofile(f)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def valid_header(header):
+    """Есть ли в заголовке все поля, нужные для воспроизведения"""
+    if not isinstance(header, dict) or not all(key in header for key in HEADER_KEYS):
+        return False
+    steps = header["steps"]
+    return (isinstance(steps, int) and steps >= 0 and isinstance(header["params"], list)
+            and (header["kind"] is None or header["kind"] in NAMES))
+
+
+def read_trace(path):
+    """Заголовок и шаги файла трассы.
+    
+    Шаги не читаются, а отображаются в память: StepBuffer смотрит прямо
+    в файл, и переход к любому шагу читает только нужные страницы.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: не файл трассы")
+        field = f.read(4)
+        data = f.read(struct.unpack("<I", field)[0]) if len(field) == 4 else b""
+    try:
+        header = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        header = None
+    if not valid_header(header):
+        raise ValueError(f"{path}: файл трассы повреждён")
+    
+    offset = len(MAGIC) + 4 + len(data)
+    count = header["steps"]
+    if offset + count * RECORD.itemsize > os.path.getsize(path):
+        raise ValueError(f"{path}: файл трассы обрезан")
+    if count == 0:
+        return header, StepBuffer.wrap(np.empty(0, dtype=RECORD))
+    return header, StepBuffer.wrap(np.memmap(path, dtype=RECORD, mode="r", offset=offset, shape=(count,)))
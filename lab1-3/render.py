@@ -0,0 +1,161 @@
+"""Пакетная отрисовка сцен без графического интерфейса.
+
+Сцена - JSON (список примитивов или объект с полями width, height,
+blend, primitives) либо CSV со строками "тип,алгоритм,параметры...". Примитив
+задаётся типом (line, polyline, curve, parametric), алгоритмом (имя метода
+класса алгоритмов) и параметрами метода. У ломаных и параметрических
+кривых параметры - точки; в CSV их координаты перечисляются подряд. Необязательные поля
+JSON steps, tolerance (адаптивное построение), degree и knots (степень
+и узловой вектор B-сплайна) передаются параметрической кривой.
+
+С --blend max или add покрытие пикселей копится в буфере покрытия по всем
+примитивам и накладывается на кадр один раз в конце.
+    
+    python render.py scene.json -o scene.png --blend max
+"""
+import argparse
+import csv
+import json
+
+import numpy as np
+
+from algorithms.line import LineAlgorithms
+from algorithms.curve import CurveAlgorithms
+from algorithms.parametric import ParametricAlgorithms
+from algorithms.trace import Tracer
+from managers.framebuffer import FrameBuffer
+from managers.coverage import CoverageBuffer, BLEND_MODES
+
+TOOLS = {
+    "line": ("dda", "bresenham", "wu"),
+    "polyline": ("bresenham", "wu"),
+    "curve": ("circle", "ellipse", "hyperbola", "parabola"),
+    "parametric": ("hermite", "bezier", "bspline"),
+}
+
+# Необязательные поля примитива, передаваемые параметрическим кривым
+PARAMETRIC_OPTIONS = ("steps", "tolerance", "degree", "knots")
+
+
+def number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def load_scene(path):
+    """Сцена в виде словаря с ключом primitives"""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.reader(f) if row and not row[0].lstrip().startswith("#")]
+        primitives = [
+            {"type": row[0].strip(), "algorithm": row[1].strip(), "params": [number(v) for v in row[2:]]}
+            for row in rows
+        ]
+        return {"primitives": primitives}
+    
+    with open(path, encoding="utf-8") as f:
+        scene = json.load(f)
+    if isinstance(scene, list):
+        scene = {"primitives": scene}
+    return scene
+
+
+class SceneRenderer:
+    """Растеризация примитивов сцены в буфер кадра в памяти.
+    
+    Без blend каждый пакет пикселей сразу накладывается на кадр; с blend
+    покрытие копится в буфере покрытия и выводится в конце render.
+    """
+    
+    def __init__(self, width=800, height=600, blend=None):
+        self.tracer = Tracer()
+        self.line_algo = LineAlgorithms(self.tracer)
+        self.curve_algo = CurveAlgorithms(self.tracer)
+        self.parametric_algo = ParametricAlgorithms(self.tracer)
+        self.framebuffer = FrameBuffer(width, height)
+        self.coverage = CoverageBuffer(width, height, blend) if blend else None
+        self.pixels = 0
+    
+    def render(self, primitives):
+        # Отрезки одного алгоритма растеризуются одним пакетом с отсечением по кадру
+        segments = {}
+        for primitive in primitives:
+            tool = primitive["type"]
+            algorithm = primitive["algorithm"]
+            params = primitive["params"]
+            if algorithm not in TOOLS.get(tool, ()):
+                raise ValueError(f"Неизвестный алгоритм {algorithm!r} для типа {tool!r}")
+            
+            if tool == "line":
+                segments.setdefault(algorithm, []).append(params)
+            elif tool == "polyline":
+                xs, ys, intensity, _ = getattr(self.line_algo, algorithm + "_polyline")(
+                    self.points(algorithm, params), self.framebuffer.width, self.framebuffer.height)
+                self.draw(xs, ys, intensity)
+            elif tool == "curve":
+                # Гипербола и парабола строятся только в пределах кадра
+                bounds = {}
+                if algorithm in ("hyperbola", "parabola"):
+                    bounds = {"width": self.framebuffer.width, "height": self.framebuffer.height}
+                self.plot(getattr(self.curve_algo, algorithm)(*params, **bounds))
+            else:
+                options = {key: primitive[key] for key in PARAMETRIC_OPTIONS if key in primitive}
+                self.plot(getattr(self.parametric_algo, algorithm)(*self.points(algorithm, params), **options))
+        
+        for algorithm, batch in segments.items():
+            xs, ys, intensity, _ = getattr(self.line_algo, algorithm + "_batch")(
+                batch, self.framebuffer.width, self.framebuffer.height)
+            self.draw(xs, ys, intensity)
+        
+        if self.coverage is not None:
+            self.coverage.resolve(self.framebuffer)
+            self.coverage.clear()
+    
+    def points(self, algorithm, params):
+        """Параметры ломаной или параметрической кривой: точки из плоского списка координат"""
+        if params and not isinstance(params[0], (list, tuple)):
+            params = list(zip(params[0::2], params[1::2]))
+        points = [tuple(p) for p in params]
+        return [points] if algorithm == "bspline" else points
+    
+    def plot(self, points):
+        if not points:
+            return
+        xs, ys = np.array(points, dtype=np.int64).T
+        self.draw(xs, ys, np.ones(len(xs)))
+    
+    def draw(self, xs, ys, intensity):
+        if self.coverage is not None:
+            self.coverage.accumulate(xs, ys, intensity)
+        else:
+            self.framebuffer.composite(xs, ys, intensity)
+        self.pixels += len(xs)
+    
+    def save(self, path, fmt=None):
+        fmt = fmt or ("ppm" if path.lower().endswith(".ppm") else "png")
+        data = self.framebuffer.to_ppm() if fmt == "ppm" else self.framebuffer.to_png()
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отрисовка сцены алгоритмами lab1-3 без интерфейса")
+    parser.add_argument("scene", help="файл сцены (.json или .csv)")
+    parser.add_argument("-o", "--output", default="scene.png", help="выходной файл (.png или .ppm)")
+    parser.add_argument("--format", choices=["png", "ppm"], help="формат вывода (по умолчанию по расширению)")
+    parser.add_argument("--width", type=int, help="ширина кадра (по умолчанию из сцены или 800)")
+    parser.add_argument("--height", type=int, help="высота кадра (по умолчанию из сцены или 600)")
+    parser.add_argument("--blend", choices=BLEND_MODES,
+                        help="сложение покрытия примитивов: max или add (сумма до 1); по умолчанию наложение по очереди")
+    args = parser.parse_args()
+    
+    scene = load_scene(args.scene)
+    renderer = SceneRenderer(args.width or scene.get("width", 800), args.height or scene.get("height", 600),
+                             args.blend or scene.get("blend"))
+    renderer.render(scene["primitives"])
+    renderer.save(args.output, args.format)
+    print(f"Примитивов: {len(scene['primitives'])}, пикселей: {renderer.pixels}, файл: {args.output}")
+
+
+if __name__ == "__main__":
+    main()